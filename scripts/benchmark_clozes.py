@@ -0,0 +1,78 @@
+"""Benchmark for the cloze parsing in src/enhanced_cloze/clozes.py.
+
+Compares it with the previous implementations on synthetic note content with 1 to 1000 clozes.
+
+Usage: python scripts/benchmark_clozes.py [--repeat N]
+"""
+
+import argparse
+import importlib.util
+import random
+import re
+import timeit
+from functools import partial
+from pathlib import Path
+
+CLOZES_PATH = Path(__file__).parent.parent / "src" / "enhanced_cloze" / "clozes.py"
+CLOZE_COUNTS = [1, 10, 100, 1000]
+
+
+def load_clozes_module():
+    # the module is loaded directly from its path so that the add-on package (which needs Anki) isn't imported
+    spec = importlib.util.spec_from_file_location("clozes", CLOZES_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_content(cloze_count: int) -> str:
+    rnd = random.Random(cloze_count)
+    parts = []
+    for i in range(cloze_count):
+        ordinal = rnd.randint(1, max(1, cloze_count // 3))
+        parts.append("Lorem ipsum <b>dolor</b> sit amet, consectetur adipiscing elit. ")
+        if i % 3 == 0:
+            parts.append(f"{{{{c{ordinal}::answer {i}::hint {i}}}}}")
+        else:
+            parts.append(f"{{{{c{ordinal}::answer <i>{i}</i>}}}}")
+    return "".join(parts)
+
+
+def legacy_highest_ordinal(content: str) -> int:
+    highest = 0
+    m = re.findall(r"\{\{c(\d+)::", content)
+    if m:
+        highest = max(highest, sorted([int(x) for x in m])[-1])
+    return highest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    clozes = load_clozes_module()
+    benchmarks = [
+        ("has_clozes", clozes.has_clozes),
+        ("legacy highest ordinal", legacy_highest_ordinal),
+        ("highest_ordinal", clozes.highest_ordinal),
+        ("cloze_spans", clozes.cloze_spans),
+    ]
+
+    print(f"{'function':<25}" + "".join(f"{f'{n} clozes':>15}" for n in CLOZE_COUNTS))
+    contents = {n: synthetic_content(n) for n in CLOZE_COUNTS}
+    for name, fn in benchmarks:
+        row = f"{name:<25}"
+        for n in CLOZE_COUNTS:
+            seconds = timeit.timeit(partial(fn, contents[n]), number=args.repeat)
+            row += f"{seconds / args.repeat * 1e6:>12.1f} µs"
+        print(row)
+
+    # sanity check, the implementations have to agree
+    for content in contents.values():
+        assert legacy_highest_ordinal(content) == clozes.highest_ordinal(content)
+        assert len(clozes.cloze_spans(content)) == content.count("{{c")
+
+
+if __name__ == "__main__":
+    main()
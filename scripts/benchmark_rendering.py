@@ -0,0 +1,200 @@
+"""Benchmark for rendering Enhanced Cloze cards with the anki package, no Anki GUI is needed.
+
+Creates a temporary collection with the Enhanced Cloze note type and synthetic notes with 1 to 500 clozes,
+with and without math and images, and times rendering the question and answer of each of their cards.
+The results and the sizes of the templates and of the rendered html are written to a JSON file,
+results of different template versions can be compared with --compare.
+
+Usage:
+    python scripts/benchmark_rendering.py [--out results.json] [--repeat N] [--front PATH] [--back PATH]
+    python scripts/benchmark_rendering.py --out candidate.json --compare baseline.json
+"""
+
+import argparse
+import importlib.util
+import json
+import statistics
+import sys
+import tempfile
+import time
+import types
+from copy import deepcopy
+from pathlib import Path
+
+from anki.buildinfo import version as anki_version
+from anki.collection import Collection
+
+SRC_DIR = Path(__file__).parent.parent / "src" / "enhanced_cloze"
+CLOZE_COUNTS = [1, 10, 100, 500]
+# the clozes of a note use this many different ordinals, so a note has up to this many cards
+MAX_ORDINALS = 10
+
+
+def load_add_on_modules():
+    # The add-on package is registered without running its __init__.py, which needs the Anki GUI.
+    # The modules used here only need the anki package.
+    package = types.ModuleType("enhanced_cloze")
+    package.__path__ = [str(SRC_DIR)]  # type: ignore
+    sys.modules["enhanced_cloze"] = package
+
+    bundled_note_type = importlib.import_module("enhanced_cloze.bundled_note_type")
+    note_type_model = importlib.import_module("enhanced_cloze.note_type.model")
+    return bundled_note_type, note_type_model
+
+
+def enhanced_cloze(front_path: Path, back_path: Path):
+    # This does the same as model.enhanced_cloze, which can't be imported without the Anki GUI,
+    # but the templates can be replaced to compare them with the bundled ones.
+    bundled_note_type, note_type_model = load_add_on_modules()
+    bundled = bundled_note_type.bundled_note_type()
+    front = bundled_note_type.build_template(front_path)
+    back = bundled_note_type.build_template(back_path)
+
+    note_type = deepcopy(note_type_model.enhancedModel)
+    note_type["tmpls"][0]["qfmt"] = front.template
+    note_type["tmpls"][0]["afmt"] = back.template
+    note_type["css"] = bundled.css
+
+    template_info = {
+        "version": bundled_note_type.parse_version(front.template),
+        "front_size": front.size,
+        "front_source_size": front.source_size,
+        "front_total_size": front.total_size,
+        "back_size": back.size,
+        "css_size": len(bundled.css),
+    }
+    return note_type, template_info
+
+
+def synthetic_content(cloze_count: int, math: bool, images: bool) -> str:
+    parts = []
+    for i in range(cloze_count):
+        ordinal = i % MAX_ORDINALS + 1
+        parts.append("Lorem ipsum <b>dolor</b> sit amet, consectetur adipiscing elit. ")
+        if math:
+            parts.append(f"\\(x_{{{i}}}^2 + \\frac{{a}}{{b}}\\) ")
+        if images:
+            parts.append(f'<img src="image-{i % 5}.png"> ')
+        answer = f"answer {i}"
+        if math and i % 2 == 0:
+            answer = f"\\(\\sqrt{{{i}}}\\)"
+        if i % 3 == 0:
+            parts.append(f"{{{{c{ordinal}::{answer}::hint {i}}}}}")
+        else:
+            parts.append(f"{{{{c{ordinal}::{answer}}}}}")
+    return "".join(parts)
+
+
+def benchmark(col: Collection, note_type, repeat: int):
+    results = []
+    for cloze_count in CLOZE_COUNTS:
+        for math in [False, True]:
+            for images in [False, True]:
+                note = col.new_note(note_type)
+                note["Content"] = synthetic_content(cloze_count, math, images)
+                col.add_note(note, 1)
+                cards = note.cards()
+
+                render_times = []
+                question_sizes = []
+                answer_sizes = []
+                for card in cards:
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        output = card.render_output(reload=True)
+                        render_times.append(time.perf_counter() - start)
+                    question_sizes.append(len(output.question_and_style()))
+                    answer_sizes.append(len(output.answer_and_style()))
+
+                results.append(
+                    {
+                        "clozes": cloze_count,
+                        "math": math,
+                        "images": images,
+                        "cards": len(cards),
+                        "render_ms_mean": statistics.mean(render_times) * 1000,
+                        "render_ms_max": max(render_times) * 1000,
+                        "question_size_mean": statistics.mean(question_sizes),
+                        "answer_size_mean": statistics.mean(answer_sizes),
+                    }
+                )
+    return results
+
+
+def print_results(results, baseline=None) -> None:
+    baseline_by_key = {}
+    if baseline:
+        baseline_by_key = {_result_key(r): r for r in baseline["results"]}
+
+    print(
+        f"{'clozes':>7}{'math':>6}{'images':>7}{'cards':>6}"
+        f"{'render ms':>12}{'question size':>15}{'answer size':>13}"
+        + (f"{'vs baseline':>13}" if baseline else "")
+    )
+    for r in results:
+        row = (
+            f"{r['clozes']:>7}{'yes' if r['math'] else 'no':>6}{'yes' if r['images'] else 'no':>7}{r['cards']:>6}"
+            f"{r['render_ms_mean']:>12.2f}{r['question_size_mean']:>15.0f}{r['answer_size_mean']:>13.0f}"
+        )
+        base = baseline_by_key.get(_result_key(r))
+        if base:
+            row += f"{r['render_ms_mean'] / base['render_ms_mean']:>12.2f}x"
+        print(row)
+
+
+def _result_key(result):
+    return (result["clozes"], result["math"], result["images"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--out", type=Path, help="path of the JSON file for the results"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--front",
+        type=Path,
+        default=SRC_DIR / "note_type" / "Enhanced_Cloze_Front_Side.html",
+        help="front template to benchmark instead of the bundled one",
+    )
+    parser.add_argument(
+        "--back",
+        type=Path,
+        default=SRC_DIR / "note_type" / "Enhanced_Cloze_Back_Side.html",
+        help="back template to benchmark instead of the bundled one",
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="JSON file with results to compare with"
+    )
+    args = parser.parse_args()
+
+    note_type, template_info = enhanced_cloze(args.front, args.back)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        col = Collection(str(Path(tmp_dir) / "collection.anki2"))
+        try:
+            col.models.add(note_type)
+            note_type = col.models.by_name(note_type["name"])
+            results = benchmark(col, note_type, args.repeat)
+        finally:
+            col.close()
+
+    output = {
+        "anki_version": anki_version,
+        "template": template_info,
+        "results": results,
+    }
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print(f"baseline template: {baseline['template']}")
+    print(f"template: {template_info}")
+    print_results(results, baseline)
+
+    if args.out:
+        args.out.write_text(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Builds the card templates and the media files they load from the files in src/enhanced_cloze/note_type
+and reports their sizes.
+
+The add-on builds the templates itself when it loads the note type, this script is for checking the
+result and the size savings of the minification.
+
+Usage: python scripts/build_templates.py [--out DIR]
+"""
+
+import argparse
+import importlib.util
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src" / "enhanced_cloze"
+TEMPLATE_PATHS = [
+    SRC_DIR / "note_type" / "Enhanced_Cloze_Front_Side.html",
+    SRC_DIR / "note_type" / "Enhanced_Cloze_Back_Side.html",
+]
+
+
+def load_template_build_module():
+    # the module is loaded directly from its path so that the add-on package (which needs Anki) isn't imported
+    spec = importlib.util.spec_from_file_location(
+        "template_build", SRC_DIR / "template_build.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--out", type=Path, help="directory to write the built templates to"
+    )
+    args = parser.parse_args()
+
+    template_build = load_template_build_module()
+    for path in TEMPLATE_PATHS:
+        built = template_build.build_template(path)
+        saved = 1 - built.total_size / built.source_size
+        print(
+            f"{path.name}: {built.source_size} -> {built.total_size} characters ({saved:.0%} smaller)"
+        )
+
+        for name, content in built.media_files.items():
+            print(f"  {name}: {len(content)} characters")
+
+        if args.out:
+            args.out.mkdir(parents=True, exist_ok=True)
+            (args.out / path.name).write_text(built.template)
+            for name, content in built.media_files.items():
+                (args.out / name).write_text(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,25 @@
 from aqt.gui_hooks import profile_did_open
 
+from .card_performance import setup_card_performance_collector
+from .cloze99 import setup_recompute_cloze99_after_imports
 from .compat import add_compatibility_aliases
 from .config import setup_config
 from .editor import setup_editor
-from .setup_jquery import setup_maybe_add_jquery_to_media_folder
+from .media_assets import setup_media_assets
 from .menu import setup_enhanced_cloze_menu
 from .model import setup_maybe_update_model_on_startup
+from .note_type_ids import setup_enhanced_cloze_ids
 from .patches import setup_prevent_warnings_about_clozes
+from .profiler import profiled
 
-profile_did_open.append(add_compatibility_aliases)
+profile_did_open.append(profiled(add_compatibility_aliases, "profile_did_open"))
 
 setup_config()
-setup_maybe_add_jquery_to_media_folder()
+setup_enhanced_cloze_ids()
+setup_media_assets()
 setup_maybe_update_model_on_startup()
 setup_editor()
+setup_recompute_cloze99_after_imports()
 setup_enhanced_cloze_menu()
 setup_prevent_warnings_about_clozes()
+setup_card_performance_collector()
@@ -1,18 +1,30 @@
 import json
 import copy
-from typing import Any, Callable, Dict, Iterator, List, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from aqt import mw
 from aqt.qt import *
 
 from .window import ConfigWindow
 
+# Values of these types are immutable and can be returned without copying them.
+IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=None)
+def key_path(key: str) -> Tuple[str, ...]:
+    "Splits a dotted config key into its levels. The result is cached, keys are usually constants."
+    return tuple(key.split("."))
+
 
 class ConfigManager:
     def __init__(self) -> None:
         self.config_window: Optional[ConfigWindow] = None
         self.window_open_hook: List[Callable[[ConfigWindow], None]] = []
         self._config: Dict
+        # the config as it was last loaded or saved, used to skip saving when nothing changed
+        self._saved_config: Dict = {}
         addon_dir = __name__.split(".")[0]
         self.addon_dir = addon_dir
         try:
@@ -25,10 +37,15 @@ class ConfigManager:
     def load(self) -> None:
         "Loads config from disk"
         self._config = mw.addonManager.getConfig(self.addon_dir)
+        self._saved_config = copy.deepcopy(self._config)
 
     def save(self) -> None:
-        "Writes its config data to disk."
+        """Writes its config data to disk if it changed since it was last loaded or saved.
+        Set all values first and then call this once, each call that changes the config writes the whole file."""
+        if self._config == self._saved_config:
+            return
         mw.addonManager.writeConfig(self.addon_dir, self._config)
+        self._saved_config = copy.deepcopy(self._config)
 
     def load_defaults(self) -> None:
         "call .save() afterwards to restore defaults."
@@ -38,15 +55,23 @@ class ConfigManager:
         return json.dumps(self._config)
 
     def get_from_dict(self, dict_obj: dict, key: str) -> Any:
-        "Raises KeyError if config doesn't exist"
-        levels = key.split(".")
-        return_val = dict_obj
-        for level in levels:
-            if isinstance(return_val, list):
-                level = int(level)
-            return_val = return_val[level]
+        """Raises KeyError if config doesn't exist.
+        Dicts and lists are copied so that changing them doesn't change the config, other values are immutable."""
+        return_val = self._lookup(dict_obj, key)
+        if isinstance(return_val, IMMUTABLE_TYPES):
+            return return_val
         return copy.deepcopy(return_val)
 
+    def _lookup(self, dict_obj: dict, key: str) -> Any:
+        "Returns the value without copying it. Raises KeyError if config doesn't exist"
+        return_val: Any = dict_obj
+        for level in key_path(key):
+            if isinstance(return_val, list):
+                return_val = return_val[int(level)]
+            else:
+                return_val = return_val[level]
+        return return_val
+
     def copy(self) -> Dict:
         return copy.deepcopy(self._config)
 
@@ -61,7 +86,7 @@ class ConfigManager:
         return self.get_from_dict(self._default, key)
 
     def set(self, key: str, value: Any) -> None:
-        levels = key.split(".")
+        levels = key_path(key)
         conf_obj = self._config
         for i in range(len(levels) - 1):
             level = levels[i]
@@ -76,9 +101,11 @@ class ConfigManager:
         if isinstance(conf_obj, list):
             level = int(level)
         conf_obj[level] = value
+        if self.config_window is not None:
+            self.config_window.on_config_set(key)
 
     def pop(self, key: str) -> Any:
-        levels = key.split(".")
+        levels = key_path(key)
         conf_obj = self._config
         for i in range(len(levels) - 1):
             level = levels[i]
@@ -108,7 +135,7 @@ class ConfigManager:
 
     def __contains__(self, key: str) -> bool:
         try:
-            self.get_from_dict(self._config, key)
+            self._lookup(self._config, key)
             return True
         except KeyError:
             return False
@@ -1,5 +1,6 @@
-from typing import Callable, List, Tuple, TYPE_CHECKING, Optional
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TYPE_CHECKING, Optional
 from pathlib import Path
+import time
 
 import aqt.addons
 from aqt import mw
@@ -16,13 +17,22 @@ QT6 = QT_VERSION_STR.split(".")[0] == "6"
 
 class ConfigWindow(QDialog):
     def __init__(self, conf: "ConfigManager") -> None:
+        self._init_time = time.perf_counter()
         QDialog.__init__(self, mw, Qt.WindowType.Window)  # type: ignore
         self.conf = conf
         self.mgr = mw.addonManager
         self.widget_updates: List[Callable[[], None]] = []
+        # widget updates by the config key the widget shows
+        self.key_widget_updates: Dict[str, List[Callable[[], None]]] = {}
         self.should_save_hook: List[Callable[[], bool]] = []
+        self._on_open_hook: List[Callable[[], None]] = []
         self._on_save_hook: List[Callable[[], None]] = []
         self._on_close_hook: List[Callable[[], None]] = []
+        # functions which add the widgets of tabs by tab index, tabs are built when they are shown for the first time
+        self._tab_builders: Dict[int, Callable[["ConfigLayout"], None]] = {}
+        self._setting_from_widget = False
+        # how long it took to open the window, set when it is opened
+        self.open_seconds: Optional[float] = None
         self.geom_key = f"addonconfig-{conf.addon_name}"
 
         self.setWindowTitle(f"Config for {conf.addon_name}")
@@ -40,6 +50,7 @@ class ConfigWindow(QDialog):
         self.main_tab = QTabWidget()
         main_tab = self.main_tab
         main_tab.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        main_tab.currentChanged.connect(self._maybe_build_tab)
         self.main_layout.addWidget(main_tab)
         self.setup_buttons(self.btn_layout)
 
@@ -64,9 +75,54 @@ class ConfigWindow(QDialog):
         self.save_btn.clicked.connect(self.on_save)
         btn_box.addWidget(self.save_btn)
 
-    def update_widgets(self) -> None:
+    def update_widgets(self, keys: Optional[Iterable[str]] = None) -> None:
+        """Updates the widgets to show the values in the config.
+        If keys is given, only the widgets which show these keys (or keys inside or containing them) are updated."""
+        if keys is None:
+            self._run_widget_updates(self.widget_updates)
+            return
+
+        updates: List[Callable[[], None]] = []
+        for changed_key in keys:
+            for key, key_updates in self.key_widget_updates.items():
+                if (
+                    key == changed_key
+                    or key.startswith(changed_key + ".")
+                    or changed_key.startswith(key + ".")
+                ):
+                    updates.extend(u for u in key_updates if u not in updates)
+        self._run_widget_updates(updates)
+
+    def register_widget_update(self, key: str, update: Callable[[], None]) -> None:
+        self.widget_updates.append(update)
+        self.key_widget_updates.setdefault(key, []).append(update)
+
+    def set_from_widget(self, key: str, value: Any) -> None:
+        "Sets a config value changed by a widget. The widget already shows the value, so it isn't updated."
+        self._setting_from_widget = True
+        try:
+            self.conf.set(key, value)
+        finally:
+            self._setting_from_widget = False
+
+    def on_config_set(self, key: str) -> None:
+        "Called by the ConfigManager when a value is set, updates the widgets which show it."
+        if self._setting_from_widget:
+            return
+        self.update_widgets([key])
+
+    def _update_changed_widgets(self, old_config: Dict) -> None:
+        new_config = self.conf.copy()
+        changed_keys = [
+            key
+            for key in set(old_config) | set(new_config)
+            if old_config.get(key) != new_config.get(key)
+        ]
+        self.update_widgets(changed_keys)
+
+    def _run_widget_updates(self, updates: List[Callable[[], None]]) -> None:
         try:
-            for widget_update in self.widget_updates:
+            for widget_update in updates:
                 widget_update()
         except Exception as e:
             advanced = self.advanced_window()
@@ -92,8 +148,12 @@ class ConfigWindow(QDialog):
             dial.show()
 
     def on_open(self) -> None:
+        # only the tabs which were shown were built yet, the other tabs show the config values when they are built
         self.update_widgets()
         restoreGeom(self, self.geom_key)
+        self.open_seconds = time.perf_counter() - self._init_time
+        for hook in self._on_open_hook:
+            hook()
 
     def on_save(self) -> None:
         for hook in self.should_save_hook:
@@ -108,8 +168,9 @@ class ConfigWindow(QDialog):
         self.close()
 
     def on_reset(self) -> None:
+        old_config = self.conf.copy()
         self.conf.load_defaults()
-        self.update_widgets()
+        self._update_changed_widgets(old_config)
         tooltip("Press save to save changes")
 
     def on_advanced(self) -> None:
@@ -117,8 +178,9 @@ class ConfigWindow(QDialog):
 
     def advanced_window(self) -> aqt.addons.ConfigEditor:
         def on_finish(result: int) -> None:
+            old_config = self.conf.copy()
             self.conf.load()
-            self.update_widgets()
+            self._update_changed_widgets(old_config)
 
         diag = aqt.addons.ConfigEditor(
             self, self.conf.addon_dir, self.conf._config  # type: ignore
@@ -127,24 +189,51 @@ class ConfigWindow(QDialog):
         diag.show()
         return diag
 
-    def closeEvent(self, evt: QCloseEvent) -> None:
+    def done(self, result: int) -> None:
+        # Called when the window is closed, also when it is closed with Esc which doesn't send a close event.
         # Discard the contents when clicked cancel,
         # and also in case the window was clicked without clicking any of the buttons
         for hook in self._on_close_hook:
             hook()
         self.conf.load()
+        # the window is deleted after it is closed
+        if self.conf.config_window is self:
+            self.conf.config_window = None
         saveGeom(self, self.geom_key)
-        evt.accept()
+        super().done(result)
 
     # Add Widgets
 
-    def add_tab(self, name: str) -> "ConfigLayout":
+    def add_tab(
+        self, name: str, build: Optional[Callable[["ConfigLayout"], None]] = None
+    ) -> "ConfigLayout":
+        """If build is given, it is called with the layout of the tab to add the widgets
+        when the tab is shown for the first time."""
         tab = QWidget(self)
         layout = ConfigLayout(self, QBoxLayout.Direction.TopToBottom)
         tab.setLayout(layout)
-        self.main_tab.addTab(tab, name)
+        if build is not None:
+            self._tab_builders[self.main_tab.count()] = build
+        index = self.main_tab.addTab(tab, name)
+        # the current tab is shown right away, it's built here in case currentChanged wasn't emitted for it
+        if index == self.main_tab.currentIndex():
+            self._maybe_build_tab(index)
         return layout
 
+    def _maybe_build_tab(self, index: int) -> None:
+        build = self._tab_builders.pop(index, None)
+        if build is None:
+            return
+
+        layout = self.main_tab.widget(index).layout()
+        updates_before = len(self.widget_updates)
+        build(layout)
+        # show the config values on the new widgets
+        self._run_widget_updates(self.widget_updates[updates_before:])
+
+    def execute_on_open(self, hook: Callable[[], None]) -> None:
+        self._on_open_hook.append(hook)
+
     def execute_on_save(self, hook: Callable[[], None]) -> None:
         self._on_save_hook.append(hook)
 
@@ -185,6 +274,9 @@ class ConfigLayout(QBoxLayout):
         self.config_window = conf_window
         self.widget_updates = conf_window.widget_updates
 
+    def _on_widget_update(self, key: str, update: Callable[[], None]) -> None:
+        self.config_window.register_widget_update(key, update)
+
     # Config Input Widgets
 
     def checkbox(
@@ -203,10 +295,10 @@ class ConfigLayout(QBoxLayout):
                 raise InvalidConfigValueError(key, "boolean", value)
             checkbox.setChecked(value)
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
         checkbox.stateChanged.connect(
-            lambda s: self.conf.set(
+            lambda s: self.config_window.set_from_widget(
                 key,
                 s == (Qt.CheckState.Checked.value if QT6 else Qt.CheckState.Checked),
             )
@@ -238,9 +330,11 @@ class ConfigLayout(QBoxLayout):
                 )
             combobox.setCurrentIndex(index)
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
-        combobox.currentTextChanged.connect(lambda text: self.conf.set(key, text))
+        combobox.currentTextChanged.connect(
+            lambda text: self.config_window.set_from_widget(key, text)
+        )
 
         if description is not None:
             row = self.hlayout()
@@ -268,9 +362,11 @@ class ConfigLayout(QBoxLayout):
             line_edit.setText(val)
             line_edit.setCursorPosition(0)
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
-        line_edit.textChanged.connect(lambda text: self.conf.set(key, text))
+        line_edit.textChanged.connect(
+            lambda text: self.config_window.set_from_widget(key, text)
+        )
 
         if description is not None:
             row = self.hlayout()
@@ -321,9 +417,11 @@ class ConfigLayout(QBoxLayout):
                 )
             spin_box.setValue(val)
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
-        spin_box.valueChanged.connect(lambda val: self.conf.set(key, val))
+        spin_box.valueChanged.connect(
+            lambda val: self.config_window.set_from_widget(key, val)
+        )
 
         if description is not None:
             row = self.hlayout()
@@ -378,7 +476,7 @@ class ConfigLayout(QBoxLayout):
                 rgb = "#" + rgb[3:] + rgb[1:3]  # ARGB to RGBA
             else:
                 rgb = color.name()
-            self.conf.set(key, rgb)
+            self.config_window.set_from_widget(key, rgb)
             set_color(rgb)
 
         def open_color_dialog() -> None:
@@ -389,7 +487,7 @@ class ConfigLayout(QBoxLayout):
             color_dialog.colorSelected.connect(lambda c: save(c))
             color_dialog.exec()
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
         button.clicked.connect(lambda _: open_color_dialog())
 
@@ -445,10 +543,10 @@ class ConfigLayout(QBoxLayout):
                     self.config_window, directory=parent_dir, filter=filter
                 )[0]
             if path:  # is None if cancelled
-                self.conf.set(key, path)
+                self.config_window.set_from_widget(key, path)
                 update()
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
         button.clicked.connect(get_path)
 
         return (line_edit, button)
@@ -469,10 +567,12 @@ class ConfigLayout(QBoxLayout):
             val = val.replace(" ", "")
             edit.setKeySequence(val)
 
-        self.widget_updates.append(update)
+        self._on_widget_update(key, update)
 
         edit.keySequenceChanged.connect(  # type: ignore
-            lambda s: self.conf.set(key, edit.keySequence().toString())
+            lambda s: self.config_window.set_from_widget(
+                key, edit.keySequence().toString()
+            )
         )
 
         self.addWidget(edit)
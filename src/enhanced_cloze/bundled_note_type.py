@@ -0,0 +1,90 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .config_block import ConfigBlock
+from .constants import ENHANCED_CLOZE_SEPARATOR, NOTE_TYPE_DIR
+from .template_build import build_template
+
+FRONT_PATH = NOTE_TYPE_DIR / "Enhanced_Cloze_Front_Side.html"
+BACK_PATH = NOTE_TYPE_DIR / "Enhanced_Cloze_Back_Side.html"
+CSS_PATH = NOTE_TYPE_DIR / "Enhanced_Cloze_CSS.css"
+
+VERSION_RE = re.compile("<!-- VERSION (.+?) -->")
+
+
+class BundledNoteType(NamedTuple):
+    """The note type files shipped with the add-on, parsed once.
+
+    Instances are shared between callers, use model.enhanced_cloze() if you need a note type dict that can be modified.
+    """
+
+    front: str
+    back: str
+    css: str
+    version: Optional[Tuple[int, ...]]
+    # the options of the front template, don't modify it
+    config_block: ConfigBlock
+    separator_start: int
+    separator_end: int
+    # hash of the files, changes whenever any of them changes
+    digest: str
+    # content of the files the templates load from the media folder by their names
+    media_files: Dict[str, str]
+
+    @property
+    def front_after_separator(self) -> str:
+        return self.front[self.separator_end :]
+
+
+class _Cache:
+    def __init__(self) -> None:
+        self.note_type: Optional[BundledNoteType] = None
+        # modification times of the source files of the cached note type
+        self.mtimes: Dict[Path, int] = {}
+
+
+_cache = _Cache()
+
+
+def bundled_note_type() -> BundledNoteType:
+    """Returns the bundled note type, the files are only read again if they were modified."""
+    if _cache.note_type is None or any(
+        path.stat().st_mtime_ns != mtime for path, mtime in _cache.mtimes.items()
+    ):
+        _cache.note_type, source_paths = _load_bundled_note_type()
+        _cache.mtimes = {path: path.stat().st_mtime_ns for path in source_paths}
+    return _cache.note_type
+
+
+def parse_version(front: str) -> Optional[Tuple[int, ...]]:
+    m = VERSION_RE.match(front)
+    if not m:
+        return None
+
+    return tuple(map(int, m.group(1).split(".")))
+
+
+def _load_bundled_note_type() -> Tuple[BundledNoteType, List[Path]]:
+    built_front = build_template(FRONT_PATH)
+    built_back = build_template(BACK_PATH)
+    with open(CSS_PATH) as f:
+        css = f.read()
+
+    front = built_front.template
+    back = built_back.template
+    separator_start = front.index(ENHANCED_CLOZE_SEPARATOR)
+    note_type = BundledNoteType(
+        front=front,
+        back=back,
+        css=css,
+        version=parse_version(front),
+        config_block=ConfigBlock.parse(front),
+        separator_start=separator_start,
+        separator_end=separator_start + len(ENHANCED_CLOZE_SEPARATOR),
+        digest=hashlib.sha1(f"{front}{back}{css}".encode()).hexdigest(),
+        media_files={**built_front.media_files, **built_back.media_files},
+    )
+    source_paths = [*built_front.source_paths, *built_back.source_paths, CSS_PATH]
+    return note_type, source_paths
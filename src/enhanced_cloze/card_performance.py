@@ -0,0 +1,129 @@
+"""Collects the performance data of the card template.
+
+When the collectPerformanceData option of the note type is enabled, the card template measures how long
+the phases of rendering the card, toggling clozes and typesetting MathJax take and sends the durations
+to the add-on using pycmd. They are aggregated per note so that the slowest notes can be found.
+
+The reports are sent with a delay, so the card which is shown when a report arrives isn't necessarily the card
+the report is about. The id of the note is therefore passed to the template when a card is shown and sent back
+with each report.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from aqt.gui_hooks import card_will_show, webview_did_receive_js_message
+
+from .note_type_ids import enhanced_cloze_ids
+from .profiler import profiled
+
+try:
+    from anki.cards import Card  # pylint: disable = unused-import
+except:  # noqa
+    pass
+
+PERFORMANCE_MESSAGE_PREFIX = "enhancedCloze:performance:"
+
+# the phases which are shown in the report, the template measures some more
+REPORTED_PHASES = ["main", "render", "mathjax", "toggleCloze"]
+
+
+class NotePerformance:
+    def __init__(self) -> None:
+        self.clozes = 0
+        self.content_length = 0
+        # total duration in ms and count of each phase
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, report: Dict[str, Any]) -> None:
+        self.clozes = report.get("clozes", self.clozes)
+        self.content_length = report.get("contentLength", self.content_length)
+        for phase, measurement in report.get("phases", {}).items():
+            total = self.phases.setdefault(phase, [0.0, 0])
+            total[0] += measurement["ms"]
+            total[1] += measurement["count"]
+
+    @property
+    def displays(self) -> int:
+        "How often the card template was rendered."
+        return int(self.phases.get("main", [0.0, 0])[1])
+
+    def mean_ms(self, phase: str) -> float:
+        total_ms, count = self.phases.get(phase, [0.0, 0])
+        return total_ms / count if count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "clozes": self.clozes,
+            "content_length": self.content_length,
+            "displays": self.displays,
+            "mean_ms": {phase: self.mean_ms(phase) for phase in self.phases},
+        }
+
+
+_note_performance: Dict[int, NotePerformance] = {}
+
+
+def setup_card_performance_collector() -> None:
+    card_will_show.append(profiled(_add_note_id, "card_will_show"))
+    webview_did_receive_js_message.append(
+        profiled(_on_js_message, "webview_did_receive_js_message")
+    )
+
+
+def _add_note_id(text: str, card: "Card", _kind: str) -> str:
+    if card.note().mid not in enhanced_cloze_ids():
+        return text
+    return f"<script>var enhancedClozesNoteId = {card.nid}</script>{text}"
+
+
+def _on_js_message(
+    handled: Tuple[bool, Any], message: str, context: Any
+) -> Tuple[bool, Any]:
+    if not message.startswith(PERFORMANCE_MESSAGE_PREFIX):
+        return handled
+
+    report = json.loads(message[len(PERFORMANCE_MESSAGE_PREFIX) :])
+    note_id = report.get("noteId")
+    if note_id is None:
+        # the template didn't get the note id, fall back to the card which is shown now
+        card = getattr(context, "card", None)
+        # the previewer has a card method instead of a card attribute
+        if callable(card):
+            card = card()
+        if card is not None:
+            note_id = card.nid
+    if note_id is not None:
+        _note_performance.setdefault(note_id, NotePerformance()).add(report)
+
+    return (True, None)
+
+
+def reset_card_performance() -> None:
+    _note_performance.clear()
+
+
+def card_performance_results() -> Dict[str, Any]:
+    return {str(nid): perf.to_dict() for nid, perf in _note_performance.items()}
+
+
+def slowest_notes_report(limit: Optional[int] = 20) -> str:
+    "Returns the notes which took the longest to render on average as text."
+    if not _note_performance:
+        return "No performance data was collected yet."
+
+    notes = sorted(
+        _note_performance.items(),
+        key=lambda item: item[1].mean_ms("main"),
+        reverse=True,
+    )[:limit]
+    lines = [
+        f"{'note id':<16}{'shown':>7}{'clozes':>8}{'length':>9}"
+        + "".join(f"{f'{phase} ms':>16}" for phase in REPORTED_PHASES)
+    ]
+    for nid, perf in notes:
+        lines.append(
+            f"{nid:<16}{perf.displays:>7}{perf.clozes:>8}{perf.content_length:>9}"
+            + "".join(f"{perf.mean_ms(phase):>16.2f}" for phase in REPORTED_PHASES)
+        )
+    return "\n".join(lines)
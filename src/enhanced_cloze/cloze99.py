@@ -0,0 +1,156 @@
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from anki.utils import ids2str
+from aqt import mw
+
+from .clozes import has_clozes
+from .constants import ANKI_VERSION_TUPLE
+from .note_type_ids import enhanced_cloze_ids, invalidate_enhanced_cloze_ids
+from .profiler import profiled
+
+try:
+    from anki.collection import (  # pylint: disable = unused-import
+        Collection,
+        ImportLogWithChanges,
+        OpChangesWithCount,
+    )
+    from anki.notes import Note, NoteId  # pylint: disable = unused-import
+except:  # noqa
+    pass
+
+# notes are loaded and saved in chunks of this size so that memory usage stays low for large collections
+CHUNK_SIZE = 1000
+
+
+def cloze99_for_content(content: str) -> str:
+    # Anki only generates cards for notes with clozes, so notes without clozes in the Content field
+    # get a cloze in the Cloze99 field (this is needed so the no-cloze mode works)
+    if has_clozes(content):
+        return ""
+    return "{{c1::.}}"
+
+
+def recompute_cloze99(
+    col: "Collection",
+    note_ids: Optional[Sequence["NoteId"]] = None,
+    undo_entry: Optional[int] = None,
+    show_progress: bool = True,
+) -> "OpChangesWithCount":
+    """Recomputes the Cloze99 field of the Enhanced Cloze notes with the given ids (or of all Enhanced Cloze notes
+    if note_ids is None) and saves the notes that changed. All changes are merged into one undo entry,
+    into undo_entry if it is passed. The count of the result is the number of changed notes.
+    Pass show_progress=False when the caller shows its own progress."""
+    mids = enhanced_cloze_ids()
+    if note_ids is None:
+        all_note_ids = col.db.list(f"select id from notes where mid in {ids2str(mids)}")
+    else:
+        all_note_ids = col.db.list(
+            f"select id from notes where id in {ids2str(note_ids)} and mid in {ids2str(mids)}"
+        )
+    if not all_note_ids:
+        # no undo entry is added so that e.g. imports of other notes don't get an additional undo step
+        return OpChangesWithCount(count=0)
+
+    if undo_entry is None:
+        undo_entry = col.add_custom_undo_entry("Recompute Cloze99")
+    # ords of the Content and Cloze99 fields by note type id
+    field_ords: Dict[int, Tuple[int, int]] = {}
+    count = 0
+    for chunk_start in range(0, len(all_note_ids), CHUNK_SIZE):
+        chunk = all_note_ids[chunk_start : chunk_start + CHUNK_SIZE]
+        if show_progress:
+            mw.taskman.run_on_main(
+                partial(
+                    mw.progress.update,
+                    label="Recomputing Cloze99...",
+                    value=chunk_start,
+                    max=len(all_note_ids),
+                )
+            )
+
+        changed_notes: List["Note"] = []
+        for note_id, mid, flds in col.db.execute(
+            f"select id, mid, flds from notes where id in {ids2str(chunk)}"
+        ):
+            if mid not in field_ords:
+                field_names = col.models.field_names(col.models.get(mid))
+                field_ords[mid] = (
+                    field_names.index("Content"),
+                    field_names.index("Cloze99"),
+                )
+            content_ord, cloze99_ord = field_ords[mid]
+
+            fields = flds.split("\x1f")
+            cloze99 = cloze99_for_content(fields[content_ord])
+            if fields[cloze99_ord] == cloze99:
+                continue
+
+            note = col.get_note(note_id)
+            note["Cloze99"] = cloze99
+            changed_notes.append(note)
+
+        if changed_notes:
+            col.update_notes(changed_notes)
+            count += len(changed_notes)
+
+    return OpChangesWithCount(changes=col.merge_undo_entries(undo_entry), count=count)
+
+
+def setup_recompute_cloze99_after_imports() -> None:
+    """Anki's importers write the notes without calling note_will_flush, so Cloze99 is updated for
+    the imported notes in one batch after the import."""
+    if ANKI_VERSION_TUPLE < (2, 1, 45):
+        return
+
+    from anki.collection import Collection
+    from anki.importing.noteimp import NoteImporter
+
+    original_import_notes = NoteImporter.importNotes
+
+    def new_import_notes(self, notes) -> None:
+        original_import_notes(self, notes)
+        invalidate_enhanced_cloze_ids()
+        # the importer only keeps the ids of the imported notes in this attribute
+        recompute_cloze99(self.col, self._ids)  # pylint: disable = protected-access
+
+    NoteImporter.importNotes = profiled(  # type: ignore
+        new_import_notes, "NoteImporter.importNotes"
+    )
+
+    for name in [
+        "import_anki_package",
+        "import_csv",
+        "import_json_file",
+        "import_json_string",
+    ]:
+        if hasattr(Collection, name):
+            setattr(
+                Collection,
+                name,
+                profiled(
+                    _recompute_cloze99_after(getattr(Collection, name)),
+                    f"Collection.{name}",
+                ),
+            )
+
+
+def _recompute_cloze99_after(
+    import_fn: Callable[..., "ImportLogWithChanges"]
+) -> Callable[..., "ImportLogWithChanges"]:
+    def wrapper(
+        self: "Collection", *args: Any, **kwargs: Any
+    ) -> "ImportLogWithChanges":
+        result = import_fn(self, *args, **kwargs)
+
+        note_ids = [note.id.nid for note in result.log.new]
+        note_ids.extend(note.id.nid for note in result.log.updated)
+        if note_ids:
+            # the import could have added Enhanced Cloze note types
+            invalidate_enhanced_cloze_ids()
+            # merge the changes into the undo entry of the import
+            recompute_cloze99(self, note_ids, undo_entry=self.undo_status().last_step)
+
+        return result
+
+    return wrapper
@@ -0,0 +1,45 @@
+"""Parsing of cloze deletions like {{c1::answer::hint}}.
+
+This module doesn't depend on Anki, so that it can be used by the scripts in the scripts folder.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple
+
+# This is the same regex as the clozeRegex in the front template.
+CLOZE_RE = re.compile(r"{{c(\d+)::([\W\w]*?)(?:::([\W\w]*?))?}}")
+
+
+class ClozeSpan(NamedTuple):
+    ordinal: int
+    answer: str
+    # empty if the cloze has no hint
+    hint: str
+    # start and end offsets of the whole cloze in the parsed text
+    start: int
+    end: int
+
+
+def iter_clozes(text: str) -> Iterator[ClozeSpan]:
+    "Yields the clozes of the text in one pass, in the order they appear in."
+    for m in CLOZE_RE.finditer(text):
+        yield ClozeSpan(
+            ordinal=int(m.group(1)),
+            answer=m.group(2),
+            hint=m.group(3) or "",
+            start=m.start(),
+            end=m.end(),
+        )
+
+
+def cloze_spans(text: str) -> List[ClozeSpan]:
+    return list(iter_clozes(text))
+
+
+def has_clozes(text: str) -> bool:
+    return next(iter_clozes(text), None) is not None
+
+
+def highest_ordinal(text: str) -> int:
+    "Returns 0 if there are no clozes."
+    return max((span.ordinal for span in iter_clozes(text)), default=0)
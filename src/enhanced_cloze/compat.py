@@ -1,3 +1,5 @@
+from typing import Optional
+
 import aqt
 from anki import notes
 
@@ -9,6 +11,8 @@ def add_compatibility_aliases() -> None:
         "model",
     )
     add_compatibility_alias(aqt.mw.col.models, "by_name", "byName")
+    if "id_for_name" not in dir(aqt.mw.col.models):
+        setattr(aqt.mw.col.models, "id_for_name", _id_for_name)
     add_compatibility_alias(aqt.mw.col.models, "field_names", "fieldNames")
     add_compatibility_alias(aqt.mw.col.models, "field_map", "fieldMap")
     add_compatibility_alias(aqt.editor.Editor, "call_after_note_saved", "saveNow")
@@ -22,3 +26,9 @@ def add_compatibility_alias(namespace, new_name: str, old_name: str) -> bool:
         return True
 
     return False
+
+
+def _id_for_name(name: str) -> Optional[int]:
+    # older Anki versions don't have id_for_name, this fetches the whole note type
+    model = aqt.mw.col.models.by_name(name)
+    return model["id"] if model else None
@@ -1,4 +1,22 @@
-from .ankiaddonconfig import ConfigManager, ConfigWindow
+import json
+from typing import Any, Dict
+
+from aqt.qt import QFontDatabase, QPushButton
+from aqt.utils import getSaveFile, tooltip
+
+from .ankiaddonconfig import ConfigLayout, ConfigManager, ConfigWindow
+from .constants import ANKI_VERSION_TUPLE, MODEL_NAME
+
+try:
+    from anki.collection import Collection  # pylint: disable = unused-import
+except:  # noqa
+    pass
+
+PROFILE_HOOKS_CONFIG_KEY = "profileHooks"
+
+# Config keys of options of the add-on, the other keys are options of the note type
+# which are stored on its front template.
+ADD_ON_CONFIG_KEYS = [PROFILE_HOOKS_CONFIG_KEY]
 
 conf = ConfigManager()
 
@@ -6,7 +24,8 @@ conf = ConfigManager()
 def setup_config():
     conf.use_custom_window()
     conf.on_window_open(_on_config_window_open)
-    conf.add_config_tab(_general_tab)
+    conf.add_config_tab(_add_general_tab)
+    conf.add_config_tab(_add_debug_tab)
 
 
 def _on_config_window_open(conf_window: ConfigWindow) -> None:
@@ -14,6 +33,23 @@ def _on_config_window_open(conf_window: ConfigWindow) -> None:
     The options don't really need to be saved in the config and they are overwritten with the values on the model when
     the config window is opened.
     """
+    from .profiler import log_event
+
+    conf_window.execute_on_open(
+        lambda: log_event(
+            "config window opened",
+            duration_ms=round(conf_window.open_seconds * 1000, 1),
+        )
+    )
+
+    if ANKI_VERSION_TUPLE < (2, 1, 45):
+        _load_model_config_values_now(conf_window)
+        return
+
+    _load_model_config_values_in_background(conf_window)
+
+
+def _load_model_config_values_now(conf_window: ConfigWindow) -> None:
     from .model import (
         config_values_from_model,
         add_or_update_model,
@@ -29,12 +65,106 @@ def _on_config_window_open(conf_window: ConfigWindow) -> None:
         conf.set(key, d[key])
 
     # Update the model when the config is saved
-    conf_window.execute_on_save(update_model_options_with_config_values)
+    def on_save() -> None:
+        update_model_options_with_config_values()
+
+    conf_window.execute_on_save(on_save)
+
+
+def _load_model_config_values_in_background(conf_window: ConfigWindow) -> None:
+    """The model is created or updated and its values are loaded in the background. Only updating from an unnamed
+    version is done on the main thread, because it asks the user. The window shows the values saved in the config
+    until then. The widgets are disabled in the meantime, so that the values can't be changed and saved before they
+    are replaced by the values on the model."""
+    from anki.collection import OpChanges
+    from aqt import mw
+    from aqt.operations import CollectionOp, QueryOp
+
+    from .model import (
+        add_or_update_model,
+        config_values_from_model,
+        incoming_version,
+        update_model_options_with_config_values,
+        version,
+    )
+
+    def set_widgets_enabled(enabled: bool) -> None:
+        conf_window.main_tab.setEnabled(enabled)
+        conf_window.reset_btn.setEnabled(enabled)
+        conf_window.advanced_btn.setEnabled(enabled)
+        conf_window.save_btn.setEnabled(enabled)
+
+    # the window can be closed before the values are loaded
+    closed = False
+    # set in the background if the model has an unnamed version
+    unnamed_version = False
+
+    def on_finished() -> None:
+        nonlocal closed
+        closed = True
+
+    def update_model(col: "Collection") -> OpChanges:
+        nonlocal unnamed_version
 
+        model = col.models.by_name(MODEL_NAME)
+        if model:
+            model_version = version(model)
+            if model_version is None:
+                unnamed_version = True
+                return OpChanges()
+            if model_version >= incoming_version():
+                return OpChanges()
 
-def _general_tab(conf_window: ConfigWindow) -> None:
-    tab = conf_window.add_tab("General")
+        # Create the model if it doesn't exist or update it to the bundled version
+        add_or_update_model()
+        return OpChanges(notetype=True)
 
+    def on_model_updated(_changes: OpChanges) -> None:
+        if unnamed_version:
+            # asks the user whether to update
+            add_or_update_model()
+        if closed:
+            return
+
+        # the window can be closed before the values are loaded, so the main window is the parent
+        QueryOp(
+            parent=mw, op=lambda col: config_values_from_model(), success=on_loaded
+        ).run_in_background()
+
+    def on_loaded(values: Dict[str, Any]) -> None:
+        if closed:
+            return
+
+        for key, value in values.items():
+            conf.set(key, value)
+        set_widgets_enabled(True)
+
+    def on_save() -> None:
+        # the config is copied here because it is reloaded when the window is closed
+        config = conf.copy()
+        CollectionOp(
+            parent=mw,
+            op=lambda col: update_model_options_with_config_values(config),
+        ).run_in_background()
+
+    set_widgets_enabled(False)
+    conf_window.finished.connect(on_finished)
+    conf_window.execute_on_save(on_save)
+    CollectionOp(parent=mw, op=update_model).success(
+        on_model_updated
+    ).run_in_background()
+
+
+# the tabs are built when they are shown for the first time
+def _add_general_tab(conf_window: ConfigWindow) -> None:
+    conf_window.add_tab("General", _general_tab)
+
+
+def _add_debug_tab(conf_window: ConfigWindow) -> None:
+    conf_window.add_tab("Debug", _debug_tab)
+
+
+def _general_tab(tab: ConfigLayout) -> None:
     tab.text("Shorcuts", bold=True)
     tab.shortcut_edit(
         "revealNextGenuineClozeShortcut", "Shortcut to reveal next genuine cloze"
@@ -73,3 +203,67 @@ def _general_tab(conf_window: ConfigWindow) -> None:
     tab.checkbox("animateScroll", "Animate scrolling")
 
     tab.stretch()
+
+
+def _debug_tab(tab: ConfigLayout) -> None:
+    from .card_performance import (
+        card_performance_results,
+        reset_card_performance,
+        slowest_notes_report,
+    )
+    from .profiler import profiling_report, profiling_results, reset_profiling_results
+
+    tab.text("Profiling", bold=True)
+    tab.checkbox(
+        PROFILE_HOOKS_CONFIG_KEY,
+        "Measure how long the add-on's hooks take (takes effect after restarting Anki)",
+    )
+    tab.checkbox(
+        "collectPerformanceData",
+        "Measure how long rendering cards and revealing clozes takes",
+    )
+    tab.space(8)
+
+    scroll = tab.scroll_layout()
+    fixed_font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+    hooks_label = scroll.text(profiling_report())
+    hooks_label.setFont(fixed_font)
+    scroll.space(8)
+    scroll.text("Slowest notes", bold=True)
+    notes_label = scroll.text(slowest_notes_report())
+    notes_label.setFont(fixed_font)
+
+    def on_reset() -> None:
+        reset_profiling_results()
+        reset_card_performance()
+        hooks_label.setText(profiling_report())
+        notes_label.setText(slowest_notes_report())
+
+    def on_export() -> None:
+        path = getSaveFile(
+            tab.config_window,
+            "Export Profiling Results",
+            "enhanced_cloze_profiling",
+            "JSON",
+            ".json",
+            "enhanced_cloze_profiling.json",
+        )
+        if not path:
+            return
+
+        with open(path, "w") as f:
+            json.dump(
+                {"hooks": profiling_results(), "notes": card_performance_results()},
+                f,
+                indent=2,
+            )
+        tooltip("Exported profiling results", parent=tab.config_window)
+
+    buttons = tab.hlayout()
+    reset_button = QPushButton("Reset")
+    reset_button.clicked.connect(on_reset)
+    buttons.addWidget(reset_button)
+    export_button = QPushButton("Export...")
+    export_button.clicked.connect(on_export)
+    buttons.addWidget(export_button)
+    buttons.stretch()
@@ -0,0 +1,131 @@
+"""Parses and serializes the options of the note type.
+
+The options are javascript variables in the part of the front template before the <!-- CONFIG END --> comment:
+
+    <!-- VERSION 1.15 -->
+    <script>
+        var scrollToClozeOnToggle = true
+        var revealNextGenuineClozeShortcut = "J"
+    </script>
+    <!-- CONFIG END -->
+
+The block is parsed line by line. Lines which are not options are kept as they are and so are the lines of options
+which weren't changed, so serializing a block which wasn't changed returns the same text.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from .constants import CONFIG_END_MARKER
+
+OPTION_RE = re.compile(r"(\s*)var +([\w$]+) *= *(.+)")
+
+ConfigValue = Union[str, bool]
+
+
+class ConfigLine:
+    def __init__(self, text: str, indent: str = "", key: Optional[str] = None) -> None:
+        self.text = text
+        self.indent = indent
+        # None if the line is not an option
+        self.key = key
+
+
+class ConfigBlock:
+    def __init__(self, lines: List[ConfigLine], rest: str) -> None:
+        self.lines = lines
+        # the part of the front template after the config block, starting with the <!-- CONFIG END --> comment
+        self.rest = rest
+        self._line_by_key = {line.key: line for line in lines if line.key is not None}
+
+    @classmethod
+    def parse(cls, front: str) -> "ConfigBlock":
+        "Raises ValueError if the front template has no <!-- CONFIG END --> comment."
+        config_end = front.index(CONFIG_END_MARKER)
+        lines = []
+        for text in front[:config_end].split("\n"):
+            m = OPTION_RE.match(text)
+            if m:
+                lines.append(ConfigLine(text, indent=m.group(1), key=m.group(2)))
+            else:
+                lines.append(ConfigLine(text))
+        return cls(lines, front[config_end:])
+
+    def serialize(self) -> str:
+        "Returns the front template with the options of this block."
+        return "\n".join(line.text for line in self.lines) + self.rest
+
+    def keys(self) -> List[str]:
+        return list(self._line_by_key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._line_by_key
+
+    def values(self) -> Dict[str, ConfigValue]:
+        return {key: self.get(key) for key in self._line_by_key}
+
+    def get(self, key: str) -> ConfigValue:
+        "Raises KeyError if there is no option with this key."
+        value = OPTION_RE.match(self._line_by_key[key].text).group(3).rstrip()
+        if value == "true":
+            return True
+        elif value == "false":
+            return False
+        elif value.startswith('"') and value.endswith('"'):
+            return value[1:-1]
+        return value
+
+    def set(self, key: str, value: Any, after: Optional[str] = None) -> None:
+        """Sets the value of an option. The line of a new option is added after the option with the key after,
+        or after the last option if there is no such option."""
+        line = self._line_by_key.get(key)
+        if line is not None:
+            if self.get(key) != value:
+                line.text = f"{line.indent}var {key} = {_js_value(value)}"
+            return
+
+        previous = self._line_by_key.get(after) if after is not None else None
+        if previous is None:
+            previous = self._last_option_line()
+        if previous is not None:
+            index = self.lines.index(previous) + 1
+            indent = previous.indent
+        else:
+            index = self._script_end_index()
+            indent = ""
+        line = ConfigLine(f"{indent}var {key} = {_js_value(value)}", indent, key)
+        self.lines.insert(index, line)
+        self._line_by_key[key] = line
+
+    def add_missing_options(
+        self, other: "ConfigBlock", values: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Adds the options of other which are missing in this block in a single pass.
+        They get their values in values if they are in there, else their values in other.
+        Each option is added after the option which precedes it in other."""
+        values = values or {}
+        previous_key: Optional[str] = None
+        for key in other.keys():
+            if key not in self:
+                self.set(key, values.get(key, other.get(key)), after=previous_key)
+            previous_key = key
+
+    def _last_option_line(self) -> Optional[ConfigLine]:
+        for line in reversed(self.lines):
+            if line.key is not None:
+                return line
+        return None
+
+    def _script_end_index(self) -> int:
+        for index in range(len(self.lines) - 1, -1, -1):
+            if self.lines[index].text.strip() == "</script>":
+                return index
+        return len(self.lines)
+
+
+def _js_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    elif isinstance(value, str):
+        return f'"{value}"'
+    return str(value)
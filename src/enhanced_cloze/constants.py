@@ -6,6 +6,10 @@ MODEL_NAME = "Enhanced Cloze 2.1 v2"
 ANKI_VERSION_TUPLE = tuple(int(i) for i in anki_version.split("."))
 NOTE_TYPE_DIR = Path(__file__).parent / "note_type"
 
+# markers in the front template which the add-on relies on when updating the note type
+CONFIG_END_MARKER = "<!-- CONFIG END -->"
+ENHANCED_CLOZE_SEPARATOR = "<!-- ENHANCED_CLOZE -->"
+
 
 UPDATE_MSG = f"""\
 Do you want to update the <b>{MODEL_NAME}</b> note type?<br><br>\
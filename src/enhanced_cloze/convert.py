@@ -0,0 +1,118 @@
+"""Converts notes of the stock Cloze note type (and of other cloze note types with a Text field) to Enhanced Cloze.
+
+The notes are converted in chunks using the backend's change notetype operation, so that no Python code runs
+per note and the conversion can be cancelled between chunks. The Cloze99 field of each chunk is computed right
+after it was converted. All chunks are merged into one undo entry.
+"""
+
+from functools import partial
+from typing import Dict, List
+
+from anki.consts import MODEL_CLOZE
+from aqt import mw
+
+from .cloze99 import CHUNK_SIZE, recompute_cloze99
+from .constants import MODEL_NAME
+from .model import enhanced_cloze_note_types
+
+try:
+    from anki.collection import Collection, OpChanges  # pylint: disable = unused-import
+    from aqt.models import NotetypeDict  # pylint: disable = unused-import
+except:  # noqa
+    pass
+
+# fields of the stock Cloze note type and the fields of the Enhanced Cloze note type they are converted to,
+# fields with the same name in both note types are kept too
+CONVERTED_FIELDS = {"Text": "Content", "Back Extra": "Extra"}
+
+
+class ConversionResult:
+    def __init__(self, changes: "OpChanges", converted: int, cancelled: bool) -> None:
+        self.changes = changes
+        # number of converted notes
+        self.converted = converted
+        self.cancelled = cancelled
+
+
+def convertible_note_types(col: "Collection") -> List["NotetypeDict"]:
+    "Returns the cloze note types with a Text field, except for the Enhanced Cloze note types."
+    enhanced_cloze_ids = {
+        note_type["id"] for note_type in enhanced_cloze_note_types(col)
+    }
+    return [
+        note_type
+        for note_type in col.models.all()
+        if note_type["type"] == MODEL_CLOZE
+        and note_type["id"] not in enhanced_cloze_ids
+        and "Text" in col.models.field_names(note_type)
+    ]
+
+
+def convert_notes_to_enhanced_cloze(
+    col: "Collection", note_types: List["NotetypeDict"]
+) -> ConversionResult:
+    """Converts all notes of the note types to the Enhanced Cloze note type, which has to exist.
+    Meant to be run in a CollectionOp, it's cancelled when the user closes the progress dialog."""
+    target = col.models.by_name(MODEL_NAME)
+    note_ids_by_note_type = {
+        note_type["id"]: col.models.nids(note_type["id"]) for note_type in note_types
+    }
+    total = sum(len(note_ids) for note_ids in note_ids_by_note_type.values())
+
+    undo_entry = col.add_custom_undo_entry("Convert to Enhanced Cloze")
+    converted = 0
+    cancelled = False
+    for note_type in note_types:
+        new_fields = _new_fields(
+            col.models.field_names(note_type), col.models.field_names(target)
+        )
+        note_ids = note_ids_by_note_type[note_type["id"]]
+        for chunk_start in range(0, len(note_ids), CHUNK_SIZE):
+            if _want_cancel():
+                cancelled = True
+                break
+
+            mw.taskman.run_on_main(
+                partial(
+                    mw.progress.update,
+                    label="Converting notes to Enhanced Cloze...",
+                    value=converted,
+                    max=total,
+                )
+            )
+
+            chunk = note_ids[chunk_start : chunk_start + CHUNK_SIZE]
+            # the request is fetched for every chunk because it contains the schema modification time,
+            # which changes with every conversion
+            request = col.models.change_notetype_info(
+                old_notetype_id=note_type["id"], new_notetype_id=target["id"]
+            ).input
+            request.note_ids.extend(chunk)
+            del request.new_fields[:]
+            request.new_fields.extend(new_fields)
+            col.models.change_notetype_of_notes(request)
+            # the progress of the conversion is shown instead of the progress of recomputing Cloze99
+            recompute_cloze99(col, chunk, undo_entry=undo_entry, show_progress=False)
+            converted += len(chunk)
+
+        if cancelled:
+            break
+
+    return ConversionResult(
+        changes=col.merge_undo_entries(undo_entry),
+        converted=converted,
+        cancelled=cancelled,
+    )
+
+
+def _new_fields(old_field_names: List[str], new_field_names: List[str]) -> List[int]:
+    """Returns the index of the old field for each new field, -1 if the new field is empty after the conversion."""
+    old_field_indices: Dict[str, int] = {}
+    for index, name in enumerate(old_field_names):
+        old_field_indices[CONVERTED_FIELDS.get(name, name)] = index
+    return [old_field_indices.get(name, -1) for name in new_field_names]
+
+
+def _want_cancel() -> bool:
+    want_cancel = getattr(mw.progress, "want_cancel", None)
+    return want_cancel is not None and want_cancel()
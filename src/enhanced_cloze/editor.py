@@ -1,4 +1,3 @@
-import re
 from typing import Callable, List, Tuple
 
 from anki.hooks import note_will_flush
@@ -7,21 +6,17 @@ from aqt.editor import Editor
 from aqt.gui_hooks import editor_did_init_shortcuts
 from aqt.qt import Qt
 
-from .constants import ANKI_VERSION_TUPLE, MODEL_NAME
+from .cloze99 import cloze99_for_content
+from .clozes import highest_ordinal
+from .constants import ANKI_VERSION_TUPLE
+from .note_type_ids import enhanced_cloze_ids
+from .profiler import profiled
 
 
 # this is needed so the no-cloze mode works
 def maybe_fill_in_or_remove_cloze99(note: Note) -> None:
-    def in_use_clozes():
-        cloze_start_regex = r"{{c\d+::"
-        cloze_start_matches = re.findall(cloze_start_regex, note["Content"])
-        return [int(re.sub(r"\D", "", x)) for x in set(cloze_start_matches)]
-
-    if note and note.note_type()["name"] == MODEL_NAME:
-        if in_use_clozes():
-            note["Cloze99"] = ""
-        else:
-            note["Cloze99"] = "{{c1::.}}"
+    if note and note.mid in enhanced_cloze_ids():
+        note["Cloze99"] = cloze99_for_content(note["Content"])
 
 
 def make_cloze_shortcut_start_at_cloze1(shortcuts: List[Tuple], editor: Editor) -> None:
@@ -29,18 +24,14 @@ def make_cloze_shortcut_start_at_cloze1(shortcuts: List[Tuple], editor: Editor)
 
     # code adapted from original onCloze and _onCloze
     def myOnCloze(self) -> None:
-        if self.note.note_type()["name"] == MODEL_NAME:
+        if self.note.mid in enhanced_cloze_ids():
             self.call_after_note_saved(lambda: _myOnCloze(editor), keepFocus=True)
         else:
             original_onCloze(self)
 
     def _myOnCloze(self) -> None:
         # find the highest existing cloze
-        highest = 0
-        val = self.note["Content"]
-        m = re.findall(r"\{\{c(\d+)::", val)
-        if m:
-            highest = max(highest, sorted([int(x) for x in m])[-1])
+        highest = highest_ordinal(self.note["Content"])
         # reuse last?
         if not self.mw.app.keyboardModifiers() & Qt.KeyboardModifier.AltModifier:
             highest += 1
@@ -64,6 +55,8 @@ def replace_shortcut(
 
 
 def setup_editor() -> None:
-    note_will_flush.append(maybe_fill_in_or_remove_cloze99)
+    note_will_flush.append(profiled(maybe_fill_in_or_remove_cloze99, "note_will_flush"))
     if ANKI_VERSION_TUPLE < (2, 1, 50):
-        editor_did_init_shortcuts.append(make_cloze_shortcut_start_at_cloze1)
+        editor_did_init_shortcuts.append(
+            profiled(make_cloze_shortcut_start_at_cloze1, "editor_did_init_shortcuts")
+        )
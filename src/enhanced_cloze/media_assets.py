@@ -0,0 +1,58 @@
+import hashlib
+from pathlib import Path
+from typing import Dict
+
+import aqt
+from aqt.gui_hooks import profile_did_open
+
+from .bundled_note_type import bundled_note_type
+from .profiler import log_event, profiled
+
+# Name of the jQuery file in the resources folder.
+# This has to be the same filename as the card template uses.
+# The underscore in the front prevents Anki from cleaning up the file when Check Media is run.
+JQUERY_FILE_NAME = "_jquery.min.js"
+JQUERY_PATH = Path(__file__).parent / "resources" / JQUERY_FILE_NAME
+
+# Profile key under which the hashes of the files which were copied to the media folder are stored.
+# It is stored in the profile and not in the collection because the media folder isn't the same on
+# every device the collection is synced to.
+MANIFEST_PROFILE_KEY = "enhancedClozeMediaAssets"
+
+
+def setup_media_assets() -> None:
+    profile_did_open.append(profiled(_maybe_update_media_assets, "profile_did_open"))
+
+
+def media_assets() -> Dict[str, bytes]:
+    "Returns the content of the files the add-on copies to the media folder by their names."
+    result = {JQUERY_FILE_NAME: JQUERY_PATH.read_bytes()}
+    for name, content in bundled_note_type().media_files.items():
+        result[name] = content.encode()
+    return result
+
+
+def _maybe_update_media_assets() -> None:
+    # If the files were copied to the media folder before and didn't change since then,
+    # their contents aren't checked again. They are only checked for existence, because
+    # a sync or Check Media can remove them from the media folder.
+    assets = media_assets()
+    manifest = {name: hashlib.sha1(data).hexdigest() for name, data in assets.items()}
+    media_folder = Path(aqt.mw.col.media.dir())
+    if aqt.mw.pm.profile.get(MANIFEST_PROFILE_KEY) == manifest and all(
+        (media_folder / name).exists() for name in assets
+    ):
+        return
+
+    updated = []
+    for name, data in assets.items():
+        path = media_folder / name
+        # outdated copies are replaced
+        if not path.exists() or path.read_bytes() != data:
+            path.write_bytes(data)
+            updated.append(name)
+
+    # Runtime files of older versions are kept, note types on other devices
+    # may still use them until they are updated.
+    aqt.mw.pm.profile[MANIFEST_PROFILE_KEY] = manifest
+    log_event("media assets updated", files=updated)
@@ -8,14 +8,36 @@
 #            (for the included js see the top of these files)
 
 
+from typing import List, Optional
+
 from aqt import mw
 from aqt.gui_hooks import main_window_did_init
 from aqt.qt import QMenu
-from aqt.utils import askUser, tooltip
+from aqt.utils import askUser, showInfo, tooltip
 
+from .bundled_note_type import bundled_note_type
+from .cloze99 import recompute_cloze99
 from .config import conf
-from .constants import MODEL_NAME
-from .model import add_or_update_model, enhanced_cloze
+from .config_block import ConfigBlock
+from .constants import ANKI_VERSION_TUPLE, CONFIG_END_MARKER, MODEL_NAME
+from .convert import (
+    ConversionResult,
+    convert_notes_to_enhanced_cloze,
+    convertible_note_types,
+)
+from .model import (
+    NoteTypesUpgrade,
+    add_or_update_model,
+    enhanced_cloze,
+    upgrade_all_note_types,
+)
+from .profiler import profiled
+
+try:
+    from anki.collection import Collection  # pylint: disable = unused-import
+    from aqt.models import NotetypeDict  # pylint: disable = unused-import
+except:  # noqa
+    pass
 
 
 def setup_enhanced_cloze_menu() -> None:
@@ -25,8 +47,14 @@ def setup_enhanced_cloze_menu() -> None:
         add_config_action_to_menu(submenu)
         add_reset_notetype_action_to_menu(submenu)
         add_reset_css_action_to_menu(submenu)
+        if ANKI_VERSION_TUPLE >= (2, 1, 45):
+            add_upgrade_all_note_types_action_to_menu(submenu)
+            add_convert_notes_action_to_menu(submenu)
+            add_recompute_cloze99_action_to_menu(submenu)
 
-    main_window_did_init.append(on_main_window_did_init)
+    main_window_did_init.append(
+        profiled(on_main_window_did_init, "main_window_did_init")
+    )
 
 
 def add_config_action_to_menu(menu: QMenu) -> None:
@@ -38,27 +66,110 @@ def add_reset_notetype_action_to_menu(menu: QMenu) -> None:
     action = menu.addAction("Reset Enhanced Cloze note type")
 
     def on_triggered():
-        if not askUser(
-            "This will reset the Enhanced Cloze note type to its default version.\n\n"
-            "Note: After doing this the next you time you synchronize Anki will require a full sync to AnkiWeb.\n\n"
-            "Continue?",
-        ):
-            return
-
         current_model = mw.col.models.by_name(MODEL_NAME)
         if not current_model:
             add_or_update_model()
             return
 
         default_model = enhanced_cloze()
-        default_model["id"] = current_model["id"]
-        default_model["usn"] = -1  # triggers full sync
-        mw.col.models.update_dict(default_model)
+        if _field_names(current_model) != _field_names(default_model) or len(
+            current_model["tmpls"]
+        ) != len(default_model["tmpls"]):
+            _reset_notetype_with_full_sync(current_model, default_model)
+            return
+
+        changed_parts = _changed_parts(current_model, default_model)
+        if not changed_parts:
+            tooltip("The Enhanced Cloze note type is already in its default version.")
+            return
+
+        if not askUser(
+            "This will reset the Enhanced Cloze note type to its default version.\n\n"
+            f"The {_join_parts(changed_parts)} will be reset. "
+            "The fields are unchanged, so this does not require a full sync.\n\n"
+            "Continue?",
+        ):
+            return
+
+        # only the templates and the styling are changed, this is not a schema change
+        for current_template, default_template in zip(
+            current_model["tmpls"], default_model["tmpls"]
+        ):
+            current_template["qfmt"] = default_template["qfmt"]
+            current_template["afmt"] = default_template["afmt"]
+        current_model["css"] = default_model["css"]
+        mw.col.models.update_dict(current_model)
         tooltip("Successfully reset Enhanced Cloze note type.")
 
     action.triggered.connect(on_triggered)
 
 
+def _reset_notetype_with_full_sync(
+    current_model: "NotetypeDict", default_model: "NotetypeDict"
+) -> None:
+    if not askUser(
+        "This will reset the Enhanced Cloze note type to its default version.\n\n"
+        "Note: The fields of the note type differ from the default ones, so after doing this the next time you "
+        "synchronize Anki will require a full sync to AnkiWeb.\n\n"
+        "Continue?",
+    ):
+        return
+
+    default_model["id"] = current_model["id"]
+    default_model["usn"] = -1  # triggers full sync
+    mw.col.models.update_dict(default_model)
+    tooltip("Successfully reset Enhanced Cloze note type.")
+
+
+def _field_names(model: "NotetypeDict") -> List[str]:
+    return [field["name"] for field in model["flds"]]
+
+
+def _changed_parts(
+    current_model: "NotetypeDict", default_model: "NotetypeDict"
+) -> List[str]:
+    "Returns descriptions of the parts of the note type which differ from the default note type."
+    result = []
+    current_template = current_model["tmpls"][0]
+    default_template = default_model["tmpls"][0]
+    current_options = _config_block_or_none(current_template["qfmt"])
+    default_options = _config_block_or_none(default_template["qfmt"])
+    if (
+        current_options is not None
+        and default_options is not None
+        and current_options.values() != default_options.values()
+    ):
+        result.append("options")
+    if _without_options(current_template["qfmt"]) != _without_options(
+        default_template["qfmt"]
+    ):
+        result.append("front template")
+    if current_template["afmt"] != default_template["afmt"]:
+        result.append("back template")
+    if current_model["css"] != default_model["css"]:
+        result.append("styling (css)")
+    return result
+
+
+def _join_parts(parts: List[str]) -> str:
+    if len(parts) == 1:
+        return parts[0]
+    return f"{', '.join(parts[:-1])} and {parts[-1]}"
+
+
+def _config_block_or_none(front: str) -> Optional[ConfigBlock]:
+    try:
+        return ConfigBlock.parse(front)
+    except ValueError:
+        return None
+
+
+def _without_options(front: str) -> str:
+    "Returns the front template without the options so that changed options aren't reported as template changes."
+    config_end = front.find(CONFIG_END_MARKER)
+    return front if config_end == -1 else front[config_end:]
+
+
 def add_reset_css_action_to_menu(menu: QMenu) -> None:
     action = menu.addAction("Reset Enhanced Cloze note type styling (css)")
 
@@ -73,8 +184,98 @@ def add_reset_css_action_to_menu(menu: QMenu) -> None:
             add_or_update_model()
             return
 
-        current_model["css"] = enhanced_cloze()["css"]
+        current_model["css"] = bundled_note_type().css
         mw.col.models.update_dict(current_model)
         tooltip("Successfully reset Enhanced Cloze note type styling.")
 
     action.triggered.connect(on_triggered)
+
+
+def add_upgrade_all_note_types_action_to_menu(menu: QMenu) -> None:
+    action = menu.addAction("Upgrade all Enhanced Cloze note types")
+
+    def on_triggered() -> None:
+        from aqt.operations import CollectionOp
+
+        CollectionOp(parent=mw, op=upgrade_all_note_types).success(
+            _show_upgrade_summary
+        ).run_in_background()
+
+    action.triggered.connect(on_triggered)
+
+
+def _show_upgrade_summary(result: NoteTypesUpgrade) -> None:
+    if not result.upgraded and not result.up_to_date:
+        showInfo("No Enhanced Cloze note types were found.")
+        return
+
+    lines = []
+    if result.upgraded:
+        lines.append("Upgraded note types:")
+        lines.extend(f"- {name}" for name in result.upgraded)
+    if result.up_to_date:
+        if lines:
+            lines.append("")
+        lines.append("Already up to date:")
+        lines.extend(f"- {name}" for name in result.up_to_date)
+    showInfo("\n".join(lines), title="Enhanced Cloze")
+
+
+def add_convert_notes_action_to_menu(menu: QMenu) -> None:
+    action = menu.addAction("Convert Cloze notes to Enhanced Cloze")
+
+    def on_triggered() -> None:
+        from aqt.operations import CollectionOp
+
+        note_types = convertible_note_types(mw.col)
+        note_counts = {
+            note_type["name"]: mw.col.models.use_count(note_type)
+            for note_type in note_types
+        }
+        if not any(note_counts.values()):
+            tooltip("There are no Cloze notes to convert.")
+            return
+
+        note_types_text = "\n".join(
+            f"- {name}: {count} notes" for name, count in note_counts.items() if count
+        )
+        if not askUser(
+            f"This will convert the notes of these note types to the {MODEL_NAME} note type:\n\n"
+            f"{note_types_text}\n\n"
+            "The Text field is converted to the Content field and the Back Extra field to the Extra field. "
+            "The conversion can be cancelled by closing the progress window, "
+            "the notes which were converted until then stay converted.\n\n"
+            "Note: After doing this the next time you synchronize Anki will require a full sync to AnkiWeb.\n\n"
+            "Continue?",
+        ):
+            return
+
+        # Create the note type if it doesn't exist, the notes can't be converted to an outdated note type
+        if not add_or_update_model():
+            return
+
+        def on_success(result: ConversionResult) -> None:
+            message = f"Converted {result.converted} notes to {MODEL_NAME}."
+            if result.cancelled:
+                message = f"Cancelled. {message}"
+            tooltip(message)
+
+        def convert(col: "Collection") -> ConversionResult:
+            return convert_notes_to_enhanced_cloze(col, note_types)
+
+        CollectionOp(parent=mw, op=convert).success(on_success).run_in_background()
+
+    action.triggered.connect(on_triggered)
+
+
+def add_recompute_cloze99_action_to_menu(menu: QMenu) -> None:
+    action = menu.addAction("Recompute Cloze99 field of all notes")
+
+    def on_triggered() -> None:
+        from aqt.operations import CollectionOp
+
+        CollectionOp(parent=mw, op=lambda col: recompute_cloze99(col)).success(
+            lambda result: tooltip(f"Updated Cloze99 field of {result.count} notes.")
+        ).run_in_background()
+
+    action.triggered.connect(on_triggered)
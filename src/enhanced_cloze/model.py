@@ -1,44 +1,104 @@
-import re
+import time
 from copy import deepcopy
-from typing import Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple
 
 from aqt import mw
 from aqt.gui_hooks import profile_did_open, sync_did_finish
-from aqt.utils import askUser
-
-from .config import conf
-from .constants import MODEL_NAME, NOTE_TYPE_DIR, UPDATE_MSG
+from aqt.utils import askUser, tooltip
+
+from .bundled_note_type import (
+    VERSION_RE,
+    BundledNoteType,
+    bundled_note_type,
+    parse_version,
+)
+from .config import ADD_ON_CONFIG_KEYS, conf
+from .config_block import ConfigBlock, ConfigValue
+from .constants import (
+    ANKI_VERSION_TUPLE,
+    ENHANCED_CLOZE_SEPARATOR,
+    MODEL_NAME,
+    UPDATE_MSG,
+)
 from .note_type.model import enhancedModel
+from .note_type_ids import invalidate_enhanced_cloze_ids
+from .profiler import log_event, profiled
 
 try:
+    from anki.collection import Collection, OpChanges  # pylint: disable = unused-import
+    from anki.models import NotetypeId  # pylint: disable = unused-import
     from aqt.models import NotetypeDict  # pylint: disable = unused-import
 except:  # noqa
     pass
 
 from .compat import add_compatibility_aliases
 
+# Profile key under which the fingerprint of the note type check is stored.
+# It is stored in the profile and not in the collection, so that it isn't synced. Devices with different versions
+# of the add-on would otherwise overwrite each other's fingerprint on every sync.
+FINGERPRINT_PROFILE_KEY = "enhancedClozeNoteTypeFingerprint"
+
+# Values of options which are added to existing note types and differ from the defaults of new note types,
+# so that the note types keep behaving like they did before the options existed.
+ADDED_OPTION_VALUES = {"underlineRevealedPseudoClozes": True}
+
 
 def setup_maybe_update_model_on_startup() -> None:
     def on_profile_did_open():
         add_compatibility_aliases()
 
         if not mw.can_auto_sync():
-            add_or_update_model()
+            _maybe_add_or_update_model_on_startup()
         else:
             # add the function to the sync_did_finish hook
             # and remove it from the hook after sync
             # so it only gets called on the auto sync on opening Anki
             def fn():
-                add_or_update_model()
+                _maybe_add_or_update_model_on_startup()
                 sync_did_finish.remove(fn)
 
+            fn = profiled(fn, "sync_did_finish")
             sync_did_finish.append(fn)
 
-    profile_did_open.append(on_profile_did_open)
+    profile_did_open.append(profiled(on_profile_did_open, "profile_did_open"))
+
+
+def _maybe_add_or_update_model_on_startup() -> None:
+    # The fingerprint is stored after the note type was found to be up to date.
+    # If neither the bundled note type nor the note type in the collection changed since then,
+    # there is no need to fetch and parse the note type again.
+    fingerprint = _fingerprint()
+    if (
+        fingerprint is not None
+        and mw.pm.profile.get(FINGERPRINT_PROFILE_KEY) == fingerprint
+    ):
+        return
+
+    if add_or_update_model():
+        mw.pm.profile[FINGERPRINT_PROFILE_KEY] = _fingerprint()
+
+
+def _fingerprint() -> Optional[str]:
+    model_id = mw.col.models.id_for_name(MODEL_NAME)
+    if model_id is None:
+        return None
+
+    # the modification time changes when the note type is edited or changed by a sync
+    return f"{model_id}:{_note_type_mtime(model_id)}:{bundled_note_type().digest}"
+
+
+def _note_type_mtime(model_id: "NotetypeId") -> int:
+    if ANKI_VERSION_TUPLE < (2, 1, 28):
+        # older versions store the note types as json in the col table
+        return mw.col.models.get(model_id)["mod"]
+
+    # this is faster than fetching the whole note type
+    return mw.col.db.scalar("select mtime_secs from notetypes where id = ?", model_id)
 
 
-def _new_version_available() -> bool:
-    return current_version() is None or current_version() < incoming_version()
+def _new_version_available(model: "NotetypeDict") -> bool:
+    cur_version = version(model)
+    return cur_version is None or cur_version < incoming_version()
 
 
 def current_version() -> Optional[Tuple[int, ...]]:
@@ -46,139 +106,138 @@ def current_version() -> Optional[Tuple[int, ...]]:
 
 
 def incoming_version() -> Optional[Tuple[int, ...]]:
-    return version(enhanced_cloze())
+    return bundled_note_type().version
 
 
 def version(note_type: "NotetypeDict") -> Optional[Tuple[int, ...]]:
-    front = note_type["tmpls"][0]["qfmt"]
-    m = re.match("<!-- VERSION (.+?) -->", front)
-    if not m:
-        return None
-
-    return tuple(map(int, m.group(1).split(".")))
+    return parse_version(note_type["tmpls"][0]["qfmt"])
 
 
 def set_version(front: str, version: Tuple[int, ...]) -> str:
-    return re.sub(
-        "<!-- VERSION (.+?) -->",
+    return VERSION_RE.sub(
         f"<!-- VERSION {'.'.join(map(str, version))} -->",
         front,
     )
 
 
-def add_or_update_model() -> None:
+def add_or_update_model() -> bool:
+    """Adds the note type if it doesn't exist or updates it if there is a new version.
+    Returns whether the note type is up to date afterwards."""
     model = mw.col.models.by_name(MODEL_NAME)
     if not model:
         mw.col.models.add(enhanced_cloze())
-        return
+        invalidate_enhanced_cloze_ids()
+        return True
 
-    if not _new_version_available():
-        return
+    if not _new_version_available(model):
+        return True
 
-    if current_version() is None:
-        update_from_unnamed_version()
-        return
+    if version(model) is None:
+        return update_from_unnamed_version()
+
+    start = time.perf_counter()
+    from_version = version(model)
+    separator_found = upgrade_templates(model, bundled_note_type())
+    mw.col.models.update_dict(model)
+    log_event(
+        "note type updated",
+        from_version=from_version,
+        to_version=incoming_version(),
+        # if the separator is missing the whole front template was replaced
+        separator_found=separator_found,
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    return True
 
+
+def upgrade_templates(model: "NotetypeDict", bundled: BundledNoteType) -> bool:
+    """Updates the templates of the note type to the bundled version, the note type isn't saved.
+    Returns whether the separator comment was found on the front template."""
     # for the front template, update the code part, the version number and the config on the front template,
     # keep the rest as it is so that users can customize the other parts of the template
-    seperator = "<!-- ENHANCED_CLOZE -->"
     cur_front = model["tmpls"][0]["qfmt"]
-    incoming_front = enhanced_cloze()["tmpls"][0]["qfmt"]
 
-    cur_sep_m = re.search(seperator, cur_front)
-    incoming_sep_m = re.search(seperator, incoming_front)
-    if not cur_sep_m:
-        print("Could not find seperator comment, replacing whole front template")
-        model["tmpls"][0]["qfmt"] = incoming_front
+    cur_sep_idx = cur_front.find(ENHANCED_CLOZE_SEPARATOR)
+    if cur_sep_idx == -1:
+        # could not find the separator comment, replace the whole front template
+        model["tmpls"][0]["qfmt"] = bundled.front
     else:
-        cur_before_sep = cur_front[: cur_sep_m.start()]
-        incoming_after_sep = incoming_front[incoming_sep_m.end() :]
-        new_front = f"{cur_before_sep}{seperator}{incoming_after_sep}"
-        new_front = set_version(new_front, incoming_version())
-        new_front = maybe_add_config_option(
-            new_front,
-            "animateScroll",
-            "var animateScroll = true",
-            "scrollToClozeOnToggle",
-        )
-        new_front = maybe_add_config_option(
-            new_front,
-            "showHintsForPseudoClozes",
-            "var showHintsForPseudoClozes = true",
-            "animateScroll",
-        )
-        new_front = maybe_add_config_option(
-            new_front,
-            "underlineRevealedPseudoClozes",
-            "var underlineRevealedPseudoClozes = true",
-            "showHintsForPseudoClozes",
-        )
-        new_front = maybe_add_config_option(
-            new_front,
-            "underlineRevealedGenuineClozes",
-            "var underlineRevealedGenuineClozes = true",
-            "underlineRevealedPseudoClozes",
-        )
-        new_front = maybe_add_config_option(
-            new_front,
-            "revealPseudoClozesByDefault",
-            "var revealPseudoClozesByDefault = false",
-            "underlineRevealedGenuineClozes",
-        )
-        new_front = maybe_add_config_option(
-            new_front,
-            "swapLeftAndRightBorderActions",
-            "var swapLeftAndRightBorderActions = false",
-            "revealPseudoClozesByDefault",
+        cur_before_sep = cur_front[:cur_sep_idx]
+        new_front = (
+            f"{cur_before_sep}{ENHANCED_CLOZE_SEPARATOR}{bundled.front_after_separator}"
         )
+        new_front = set_version(new_front, bundled.version)
+        # add the options which were added in newer versions
+        config_block = ConfigBlock.parse(new_front)
+        config_block.add_missing_options(bundled.config_block, ADDED_OPTION_VALUES)
+        new_front = config_block.serialize()
         model["tmpls"][0]["qfmt"] = new_front
 
     # update the back template
-    model["tmpls"][0]["afmt"] = enhanced_cloze()["tmpls"][0]["afmt"]
-
-    mw.col.models.update_dict(model)
-
-
-def maybe_add_config_option(
-    front: str, option_name: str, line_to_be_added: str, previous_option_name: str
-) -> str:
-    # hacky way to add options to the CONFIG, the CONFIG being the section of the front template
-    # before the <!-- CONFIG END --> comment
-    # the text in to be added will be added after previous_option where previous_option
-    # is the name of a configuration variable
+    model["tmpls"][0]["afmt"] = bundled.back
+
+    return cur_sep_idx != -1
+
+
+class NoteTypesUpgrade:
+    def __init__(
+        self, changes: "OpChanges", upgraded: List[str], up_to_date: List[str]
+    ) -> None:
+        self.changes = changes
+        # names of the note types which were upgraded
+        self.upgraded = upgraded
+        # names of the note types which already had the bundled version
+        self.up_to_date = up_to_date
+
+
+def enhanced_cloze_note_types(col: "Collection") -> List["NotetypeDict"]:
+    """Returns the Enhanced Cloze note type and its copies, all note types which have a front template
+    with a version comment and the separator comment."""
+    return [
+        note_type
+        for note_type in col.models.all()
+        if version(note_type) is not None
+        and ENHANCED_CLOZE_SEPARATOR in note_type["tmpls"][0]["qfmt"]
+    ]
 
-    assert option_name in line_to_be_added
 
-    config_m = re.search(r"([\w\W]*?)<!-- CONFIG END -->", front)
-    config_str = config_m.group(1)
+def upgrade_all_note_types(col: "Collection") -> NoteTypesUpgrade:
+    """Upgrades the Enhanced Cloze note type and all of its copies which have an older version.
+    Meant to be run in a CollectionOp. All upgrades are merged into one undo entry."""
+    bundled = bundled_note_type()
+    outdated = []
+    up_to_date = []
+    for note_type in enhanced_cloze_note_types(col):
+        if version(note_type) >= bundled.version:
+            up_to_date.append(note_type["name"])
+        else:
+            outdated.append(note_type)
 
-    if option_name in config_str:
-        return front
+    changes = OpChanges()
+    upgraded = []
+    if outdated:
+        undo_entry = col.add_custom_undo_entry("Upgrade Enhanced Cloze note types")
+        for note_type in outdated:
+            upgrade_templates(note_type, bundled)
+            col.models.update_dict(note_type)
+            upgraded.append(note_type["name"])
+        changes = col.merge_undo_entries(undo_entry)
 
-    new_config_str = re.sub(
-        f"(?<=\n)(.*)(var +{previous_option_name}.+)\n",
-        rf"\1\2\n\1{line_to_be_added}\n",
-        config_str,
-    )
-    result = f"{new_config_str}{front[len(config_str) :]}"
-    return result
+    log_event("note types upgraded", upgraded=len(upgraded), up_to_date=len(up_to_date))
+    return NoteTypesUpgrade(changes=changes, upgraded=upgraded, up_to_date=up_to_date)
 
 
-def update_from_unnamed_version() -> None:
+def update_from_unnamed_version() -> bool:
     if not askUser(
         title="Enhanced Cloze",
         text=UPDATE_MSG,
         defaultno=True,
     ):
-        return
+        return False
 
     mm = mw.col.models
     model = mm.by_name(MODEL_NAME)
 
-    def remove_field_if_exists(field_name, model):
-        if field_name in mm.field_names(model):
-            mm.remove_field(model, mm.field_map(model)[field_name][1])
-
     fields_to_remove = [f"Cloze{i}" for i in range(1, 51)]
     fields_to_remove.extend(
         [
@@ -187,11 +246,41 @@ def update_from_unnamed_version() -> None:
         ]
     )
 
-    for field in fields_to_remove:
-        remove_field_if_exists(field, model)
+    if ANKI_VERSION_TUPLE < (2, 1, 45):
+
+        def remove_field_if_exists(field_name, model):
+            if field_name in mm.field_names(model):
+                mm.remove_field(model, mm.field_map(model)[field_name][1])
+
+        for field in fields_to_remove:
+            remove_field_if_exists(field, model)
+
+        load_enhanced_cloze(model)
+        mm.update(model)
+        return True
 
+    from aqt.operations import CollectionOp
+
+    # Every field removal is a schema change which rewrites all notes of the note type,
+    # so all fields are removed and the templates are updated in a single note type update.
+    # The backend maps the remaining fields to the notes using their "ord" values.
+    model["flds"] = [
+        field for field in model["flds"] if field["name"] not in fields_to_remove
+    ]
     load_enhanced_cloze(model)
-    mm.update(model)
+
+    def op(col: "Collection") -> "OpChanges":
+        mw.taskman.run_on_main(
+            lambda: mw.progress.update(label=f"Updating {MODEL_NAME} note type...")
+        )
+        return col.models.update_dict(model)
+
+    CollectionOp(parent=mw, op=op).success(
+        lambda _: tooltip(f"Successfully updated {MODEL_NAME} note type.")
+    ).run_in_background()
+
+    # the note type is updated in the background
+    return False
 
 
 def enhanced_cloze() -> "NotetypeDict":
@@ -201,71 +290,39 @@ def enhanced_cloze() -> "NotetypeDict":
 
 
 def load_enhanced_cloze(note_type: "NotetypeDict") -> None:
-    front_path = NOTE_TYPE_DIR / "Enhanced_Cloze_Front_Side.html"
-    css_path = NOTE_TYPE_DIR / "Enhanced_Cloze_CSS.css"
-    back_path = NOTE_TYPE_DIR / "Enhanced_Cloze_Back_Side.html"
-
-    with open(front_path) as f:
-        front = f.read()
-    with open(back_path) as f:
-        back = f.read()
-    with open(css_path) as f:
-        styling = f.read()
-
-    note_type["tmpls"][0]["qfmt"] = front
-    note_type["tmpls"][0]["afmt"] = back
-    note_type["css"] = styling
-
-
-def update_model_options_with_config_values() -> None:
-    # Create a string with the config variables and their values as javascript variables
-    conf_lines = []
-    for key in conf:
-        value = conf[key]
-        if isinstance(value, str):
-            value = f'"{value}"'
-        elif isinstance(value, bool):
-            value = "true" if value else "false"
-        conf_lines.append(f"var {key}={value}")
-    conf_str = "\n".join(conf_lines)
-
-    # Update the front template with the config variables
+    bundled = bundled_note_type()
+    note_type["tmpls"][0]["qfmt"] = bundled.front
+    note_type["tmpls"][0]["afmt"] = bundled.back
+    note_type["css"] = bundled.css
+
+
+def update_model_options_with_config_values(
+    config: Optional[Dict[str, Any]] = None
+) -> Optional["OpChanges"]:
+    """Writes the config values to the options on the front template.
+    config is a copy of the config, it is passed when this is run in the background.
+    The note type is only updated if any of the options changed."""
+    if config is None:
+        config = conf.copy()
+
     model = mw.col.models.by_name(MODEL_NAME)
     front = model["tmpls"][0]["qfmt"]
-    front = re.sub(
-        r"<script>[\w\W]*?</script>(?=\n<!-- CONFIG END -->)",
-        f"<script>\n{conf_str}\n</script>",
-        front,
-    )
-    assert conf_str in front, "Could not update note type options"
-    model["tmpls"][0]["qfmt"] = front
+    config_block = ConfigBlock.parse(front)
+    for key, value in config.items():
+        if key in ADD_ON_CONFIG_KEYS:
+            continue
+        config_block.set(key, value)
 
-    mw.col.models.update_dict(model)
+    new_front = config_block.serialize()
+    if new_front == front:
+        # updating the note type would change its modification time, which causes it to be synced
+        return OpChanges() if ANKI_VERSION_TUPLE >= (2, 1, 45) else None
 
+    model["tmpls"][0]["qfmt"] = new_front
+    return mw.col.models.update_dict(model)
 
-def config_values_from_model() -> Dict[str, Union[str, bool]]:
+
+def config_values_from_model() -> Dict[str, ConfigValue]:
     """Get the config values from the javascript variables on the model's front template"""
     front = mw.col.models.by_name(MODEL_NAME)["tmpls"][0]["qfmt"]
-    config_m = re.search(r"([\w\W]*?)<!-- CONFIG END -->", front)
-    config_str = config_m.group(1)
-    config_lines = config_str.split("\n")
-    config_lines = [
-        stripped_line
-        for line in config_lines
-        if (stripped_line := line.strip()).startswith("var")
-    ]
-    result = {}
-    for line in config_lines:
-        m = re.match(r"var +(.+?) *= *(.+)", line)
-        if not m:
-            continue
-        key, value = m.groups()
-        if value == "true":
-            value = True
-        elif value == "false":
-            value = False
-        elif value.startswith('"') and value.endswith('"'):
-            value = value[1:-1]
-        result[key] = value
-
-    return result
+    return ConfigBlock.parse(front).values()
@@ -0,0 +1,766 @@
+// the report of the previous card is sent before its data is replaced by the data of this card
+if (typeof enhancedClozesPerformance !== "undefined" && enhancedClozesPerformance["reportTimeout"] !== null) {
+    clearTimeout(enhancedClozesPerformance["reportTimeout"])
+    reportEnhancedClozesPerformance()
+}
+
+var enhancedClozesData = {
+    "clozeId": [],
+    "answers": [],
+    "hints": [],
+    // "genuine" or "pseudo" for each cloze
+    "types": [],
+    // "hint" or "answer" for each cloze, kept in sync with the show-state attributes by toggleCloze
+    "showStates": [],
+    // the cloze elements, filled in after they are inserted into the document
+    "elements": [],
+    // indices of the clozes of each type in document order
+    "indicesByType": { "genuine": [], "pseudo": [] },
+    // position of each cloze in the indices of its type
+    "positionsInType": [],
+    // number of clozes of each type which show their hint
+    "hiddenCounts": { "genuine": 0, "pseudo": 0 },
+    // all clozes of a type before this position in indicesByType are revealed
+    "firstHiddenPositions": { "genuine": 0, "pseudo": 0 },
+}
+
+// Notes with at least this many clozes are rendered in the viewport mode. In this mode an IntersectionObserver
+// tracks which clozes are in the viewport, so that checking whether a cloze is visible doesn't force a layout,
+// MathJax typesetting of clozes outside of the viewport is deferred until they become visible
+// and images are loaded lazily.
+var enhancedClozesViewportModeMinClozes = 100
+
+// the observer of the previous card observes elements which aren't in the document anymore
+if (typeof enhancedClozesViewport !== "undefined" && enhancedClozesViewport["observer"]) {
+    enhancedClozesViewport["observer"].disconnect()
+}
+var enhancedClozesViewport = {
+    // null if the note isn't rendered in the viewport mode
+    "observer": null,
+    // whether each cloze is in the viewport, undefined until the observer reported it
+    "visible": [],
+    // clozes outside of the viewport which will be typeset when they become visible
+    "deferredTypeset": new Set(),
+}
+
+// elements which need to be typeset by MathJax, they are typeset together once per animation frame
+var enhancedClozesElementsToTypeset = new Set()
+var enhancedClozesTypesetScheduled = false
+
+// durations of the phases of rendering the card and of toggling clozes,
+// they are only measured if the collectPerformanceData option is enabled
+var enhancedClozesPerformance = {
+    "enabled": typeof collectPerformanceData !== "undefined" && collectPerformanceData,
+    // set by the add-on when it shows the card, so that reports sent after the next card is shown are
+    // still attributed to the right note
+    "noteId": typeof enhancedClozesNoteId !== "undefined" ? enhancedClozesNoteId : null,
+    "contentLength": 0,
+    // total duration in ms and count of each phase since the last report
+    "pending": {},
+    // null if no report is scheduled
+    "reportTimeout": null,
+}
+
+function enhancedClozesMain() {
+
+    // Regex for clozes
+    // the extra (?:) at the beginning is there so that Anki doesn't think this is a field
+    const clozeRegex = /{(?:){c(\d+)::([\W\w]*?)(?:::([\W\w]*?))?}}/g
+
+    var ctrlDown = false;
+
+    measureEnhancedClozesPhase("main", () => {
+        measureEnhancedClozesPhase("events", () => {
+            defineEnhancedClozeAddEventListener()
+            setupKeyListenerForCtrlKey()
+        })
+        measureEnhancedClozesPhase("render", prepareEnhancedClozes)
+        measureEnhancedClozesPhase("scroll", maybeScrollToFirstGenuineCloze)
+        measureEnhancedClozesPhase("events", setupClozeEvents)
+        measureEnhancedClozesPhase("editField", setupEditFieldDuringReview)
+        measureEnhancedClozesPhase("styling", insertStyling)
+    })
+
+    function prepareEnhancedClozes() {
+        // Parses the clozes and builds the html of the enhanced clozes in one pass and inserts it with one DOM write.
+        // genuine clozes refer to those belong to current card and need to be answered, e.g. { {c2::abc} } on card2
+        // pseudo clozes refer to the opposite, e.g. { {c1::abc} } and { {c3::abc} } on card2
+        var content = document.getElementById("enhanced-cloze-content").innerHTML
+        var ord = currentClozeOrdinal(content)
+        enhancedClozesPerformance["contentLength"] = content.length
+        var html = content.replace(clozeRegex, function (match, clozeId, answer, hint) {
+            var index = enhancedClozesData["clozeId"].length
+            enhancedClozesData["clozeId"].push(clozeId)
+            enhancedClozesData["answers"].push(answer)
+            enhancedClozesData["hints"].push(hint !== undefined ? hint : "")
+
+            var clozeType = ord == clozeId ? "genuine-cloze" : "pseudo-cloze"
+            var showState = (
+                clozeType == "pseudo-cloze" && (revealPseudoClozesByDefault || answer.startsWith('#'))
+            ) ? "answer" : "hint"
+            addToEnhancedClozesIndex(index, clozeType == "genuine-cloze" ? "genuine" : "pseudo", showState)
+            // the disable-select class prevents the blue selection briefly showing up on mobile when tapping on a cloze
+            return `<span class="${clozeType} disable-select" show-state="${showState}" cid="${clozeId}" index="${index}">` +
+                `${enhancedClozeInnerHTML(index, clozeType, showState)}</span>`
+        })
+
+        var viewportMode = (
+            enhancedClozesData["clozeId"].length >= enhancedClozesViewportModeMinClozes &&
+            typeof IntersectionObserver !== "undefined"
+        )
+        if (viewportMode) {
+            html = withLazyImages(html)
+            // the answers and hints are inserted again when clozes are toggled
+            enhancedClozesData["answers"] = enhancedClozesData["answers"].map(withLazyImages)
+            enhancedClozesData["hints"] = enhancedClozesData["hints"].map(withLazyImages)
+        }
+
+        var enhDiv = document.getElementById("enhanced-clozes")
+        enhDiv.innerHTML = html
+        for (const elem of enhDiv.querySelectorAll('.genuine-cloze[index], .pseudo-cloze[index]')) {
+            enhancedClozesData["elements"][elem.getAttribute('index')] = elem
+        }
+
+        if (viewportMode) {
+            observeClozes()
+        }
+    }
+
+    function withLazyImages(html) {
+        // images outside of the viewport are only loaded and decoded when they are about to become visible
+        if (!html.includes("<img")) return html
+        return html.replace(/<img(?![^>]*\sloading=)/gi, '<img loading="lazy" decoding="async"')
+    }
+
+    function observeClozes() {
+        var observer = new IntersectionObserver(function (entries) {
+            for (const entry of entries) {
+                enhancedClozesViewport["visible"][entry.target.getAttribute('index')] = entry.isIntersecting
+                if (entry.isIntersecting && enhancedClozesViewport["deferredTypeset"].delete(entry.target)) {
+                    typesetMathjaxLater(entry.target)
+                }
+            }
+        })
+        for (const elem of enhancedClozesData["elements"]) {
+            observer.observe(elem)
+        }
+        enhancedClozesViewport["observer"] = observer
+    }
+
+    function addToEnhancedClozesIndex(index, type, showState) {
+        enhancedClozesData["types"].push(type)
+        enhancedClozesData["showStates"].push(showState)
+        enhancedClozesData["positionsInType"].push(enhancedClozesData["indicesByType"][type].length)
+        enhancedClozesData["indicesByType"][type].push(index)
+        if (showState == "hint") {
+            enhancedClozesData["hiddenCounts"][type] += 1
+        }
+    }
+
+    function currentClozeOrdinal(content) {
+        // newer Anki versions add the ordinal to the clozes of the current card
+        var currentCloze = document.querySelector('#enhanced-cloze-current-clozes .cloze[data-ordinal]')
+        if (currentCloze) return currentCloze.getAttribute('data-ordinal').split(',')[0]
+
+        var ord = clozeOrdinalFromPosition(content)
+        if (ord !== null) return ord
+
+        // The body class is only used as a last resort, the desktop reviewer sets it after the scripts of the card
+        // ran, so it is still the class of the previous card then.
+        var m = document.body.className.match(/(?:^|\s)card(\d+)(?:\s|$)/)
+        if (m) return m[1]
+
+        return ""
+    }
+
+    function clozeOrdinalFromPosition(content) {
+        // Clozes of other cards are rendered as their answers and the clozes of the current card as .cloze spans.
+        // The ordinal is the one of the first cloze in the content which has the same text before it as the first
+        // .cloze span has in the rendered field.
+        var rendered = document.getElementById("enhanced-cloze-current-clozes")
+        var firstCloze = rendered ? rendered.querySelector(".cloze") : null
+        if (!firstCloze) return null
+
+        var renderedHTML = rendered.innerHTML
+        var renderedBefore = renderedHTML.slice(0, renderedHTML.indexOf(firstCloze.outerHTML))
+        var regex = new RegExp(clozeRegex.source, "g")
+        var before = ""
+        var lastIndex = 0
+        var match
+        while ((match = regex.exec(content)) !== null) {
+            before += content.slice(lastIndex, match.index)
+            if (before == renderedBefore) return match[1]
+            // the text before the following clozes is even longer
+            if (before.length >= renderedBefore.length) return null
+            before += match[2]
+            lastIndex = regex.lastIndex
+        }
+        return null
+    }
+
+    function maybeScrollToFirstGenuineCloze() {
+        var firstGenuineCloze = document.querySelector('.genuine-cloze')
+        if (firstGenuineCloze) {
+            maybeScrollToCloze(firstGenuineCloze);
+        }
+    }
+
+
+    function setupClozeEvents() {
+        // we are not using enhancedClozeAddEventListener (which prevents duplicate event listeners) so we need to
+        // make sure that the listeners are only added once using the firstTimeLoadingEnhancedCloze variable
+        if (typeof firstTimeLoadingEnhancedCloze === 'undefined') {
+            firstTimeLoadingEnhancedCloze = false
+            if (/webOS|iPhone|iPad|iPod|BlackBerry|IEMobile|Opera Mini/i.test(navigator
+                .userAgent)) {
+                setupIOsClozeClickEvents()
+            } else {
+                setupDesktopAndAndroidClozeClickEvents()
+            }
+        }
+
+        setupClozeKeyEvents()
+    }
+    function setupDesktopAndAndroidClozeClickEvents() {
+        addDelegatedEventListener('click', '.pseudo-cloze', function (event) {
+            toggleCloze(event.target, 'toggle');
+        });
+
+        addDelegatedEventListener('click', '.genuine-cloze', function (event) {
+            toggleCloze(event.target, 'toggle');
+        });
+
+        addDelegatedEventListener('click', '#show-one-cloze-left', function (event) {
+            revealOneClozeOfAType(swapLeftAndRightBorderActions ? "pseudo" : "genuine");
+        });
+
+        addDelegatedEventListener('click', '#show-one-cloze-right', function (event) {
+            revealOneClozeOfAType(swapLeftAndRightBorderActions ? "genuine" : "pseudo");
+        });
+    }
+
+    function setupIOsClozeClickEvents() {
+        // For ios click events don't work, so we use a custom click handler
+        addMobileClickHandler(
+            '.pseudo-cloze',
+            function (event) {
+                toggleCloze(event.target, 'toggle');
+            }
+        )
+        addMobileClickHandler(
+            '.genuine-cloze',
+            function (event) {
+                toggleCloze(event.target, 'toggle');
+            }
+        )
+        addMobileClickHandler(
+            '#show-one-cloze-left',
+            function (event) {
+                revealOneClozeOfAType(swapLeftAndRightBorderActions ? "pseudo" : "genuine");
+            }
+        )
+        addMobileClickHandler(
+            '#show-one-cloze-right',
+            function (event) {
+                revealOneClozeOfAType(swapLeftAndRightBorderActions ? "genuine" : "pseudo");
+            }
+        )
+    }
+
+    function addMobileClickHandler(selector, callback) {
+        // "click" events don't work on AnkiMobile, this is a workaround.
+        // This uses touchstart and touchend events to detect a click.
+        // If the touchend position is close enough to the touchstart position,
+        // the callback is called.
+
+        // This is the maximum distance the touchend position can differ from the touchstart position
+        // to still be considered a click
+        const distanceThreshold = 10;
+        // Stores the last touchstart position
+        let touchStartPosition = null;
+
+        addDelegatedEventListener('touchstart', selector, function (event) {
+            const touches = event.touches;
+            if (touches.length === 1) {
+                const touch = touches[0];
+                touchStartPosition = {
+                    x: touch.clientX,
+                    y: touch.clientY
+                };
+            } else {
+                touchStartPosition = null;
+            }
+
+        });
+
+        addDelegatedEventListener('touchend', selector, function (event) {
+            const changedTouches = event.changedTouches;
+            if (touchStartPosition && changedTouches.length === 1) {
+                const changedTouch = changedTouches[0];
+                const touchEndX = changedTouch.clientX;
+                const touchEndY = changedTouch.clientY;
+                const diffX = Math.abs(touchStartPosition.x - touchEndX);
+                const diffY = Math.abs(touchStartPosition.y - touchEndY);
+                if (diffX < distanceThreshold && diffY < distanceThreshold) {
+                    callback(event);
+                }
+            }
+
+            touchStartPosition = null;
+        });
+    }
+
+    function addDelegatedEventListener(type, selector, handler) {
+        // calls the handler for events on elements matching the selector (or on their descendants),
+        // also for elements that are added to the document later
+        document.addEventListener(type, function (event) {
+            if (event.target instanceof Element && event.target.closest(selector)) {
+                handler(event)
+            }
+        })
+    }
+
+    function setupClozeKeyEvents() {
+        window.enhancedClozeAddEventListener("keydown", (event) => {
+            if (shortcutMatcher(revealNextGenuineClozeShortcut)(event)) {
+                revealOneClozeOfAType("genuine");
+            }
+            if (shortcutMatcher(revealAllGenuineClozesShortcut)(event)) {
+                toggleAllClozesOfAType("genuine")
+            }
+            if (shortcutMatcher(revealNextPseudoClozeShortcut)(event)) {
+                revealOneClozeOfAType("pseudo");
+            }
+            if (shortcutMatcher(revealAllPseudoClozesShortcut)(event)) {
+                toggleAllClozesOfAType("pseudo");
+            }
+        })
+    }
+
+    function setupEditFieldDuringReview() {
+        moveEditClozesElm()
+
+        document.getElementById("enhanced-clozes").onclick = function (event) {
+            if (document.getElementsByClassName("EFDRC-outline").length == 0) return
+            if (!ctrlDown) return
+            activateEditFieldDuringReview()
+        };
+
+        function moveEditClozesElm() {
+            var editClozesElm = document.getElementById("edit-clozes")
+            document.getElementById("main-section").appendChild(editClozesElm)
+        }
+
+        function activateEditFieldDuringReview() {
+            var enhancedClozesElm = document.getElementById("enhanced-clozes")
+            var editClozesElm = document.getElementById("edit-clozes")
+            if (["inline", ""].includes(enhancedClozesElm.style.display)) {
+                enhancedClozesElm.style.display = "none";
+                editClozesElm.style.display = "inline";
+            } else {
+                enhancedClozesElm.style.display = "inline";
+                editClozesElm.style.display = "none";
+            }
+            setTimeout(() => {
+                editable = editClozesElm.getElementsByClassName(
+                    "EFDRC-outline")[0]
+                editable.onfocus()
+                editable.focus()
+            })
+        }
+
+    }
+
+    function insertStyling() {
+        if (document.getElementById("enhanced-clozes-style")) return;
+
+        mainSection = document.getElementById("main-section")
+        style = document.createElement("style")
+
+        // this css is also in the css file, but inserting the css here is easier than updating the css file for all users
+        style.id = "enhanced-clozes-style"
+        style.innerHTML = `
+            .disable-select,
+            #show-one-cloze-left,
+            #show-one-cloze-right {
+                -webkit-touch-callout: none;
+                user-select: none;
+            }
+            .genuine-cloze,
+            .pseudo-cloze,
+            #show-one-cloze-left,
+            #show-one-cloze-right {
+                cursor: pointer;
+            }
+            .genuine-cloze,
+            .pseudo-cloze {
+                /* leaves some space above a cloze when scrolling to it */
+                scroll-margin-top: 60px;
+            }
+            .enhanced-cloze-fade-in {
+                animation: enhanced-cloze-fade-in 0.5s;
+            }
+            @keyframes enhanced-cloze-fade-in {
+                from { opacity: 0; }
+                to { opacity: 1; }
+            }
+        `
+
+        if (underlineRevealedPseudoClozes) {
+            style.innerHTML += `
+            .pseudo-cloze {
+                border-bottom: 1px solid #4285f4;
+                padding-bottom: 1px;
+            }`
+        }
+        if (underlineRevealedGenuineClozes) {
+            style.innerHTML += `
+            .genuine-cloze {
+                border-bottom: 1px solid #ff5c82;
+                padding-bottom: 1px;
+            }`
+        }
+        mainSection.insertBefore(style, mainSection.children[0])
+    }
+
+    function revealOneClozeOfAType(clozeType) {
+        if (!["genuine", "pseudo"].includes(clozeType)) {
+            console.log(`clozeType has unexpected value: ${clozeType}`)
+        }
+
+        var hiddenCloze = firstHiddenClozeOfAType(clozeType)
+        if (!hiddenCloze) {
+            var noMoreCloze = document.getElementById('no-more-cloze')
+            if (noMoreCloze) {
+                noMoreCloze.style.display = noMoreCloze.style.display == "block" ? "none" : "block"
+            }
+            return
+        }
+
+        revealCloze(hiddenCloze);
+    }
+
+    function toggleAllClozesOfAType(clozeType) {
+        if (!["genuine", "pseudo"].includes(clozeType)) {
+            console.log(`clozeType has unexpected value: ${clozeType}`)
+        }
+
+        var allRevealed = enhancedClozesData["hiddenCounts"][clozeType] == 0
+        for (const index of enhancedClozesData["indicesByType"][clozeType]) {
+            toggleCloze(enhancedClozesData["elements"][index], allRevealed ? "hint" : "answer");
+        }
+    }
+
+    function firstHiddenClozeOfAType(clozeType) {
+        if (enhancedClozesData["hiddenCounts"][clozeType] == 0) return null
+
+        // clozes before firstHiddenPositions are revealed, so this skips each revealed cloze at most once
+        // until a cloze before it is hidden again
+        var indices = enhancedClozesData["indicesByType"][clozeType]
+        var position = enhancedClozesData["firstHiddenPositions"][clozeType]
+        while (position < indices.length && enhancedClozesData["showStates"][indices[position]] != "hint") {
+            position += 1
+        }
+        enhancedClozesData["firstHiddenPositions"][clozeType] = position
+        return position < indices.length ? enhancedClozesData["elements"][indices[position]] : null
+    }
+
+    function revealCloze(elem) {
+        if (!isVisible(elem)) {
+            maybeScrollToCloze(elem);
+            return
+        }
+
+        toggleCloze(elem, 'answer');
+        // In the viewport mode the visibility is only updated by the observer after the next layout,
+        // checking it here again would force a layout.
+        if (!enhancedClozesViewport["observer"] && !isVisible(elem)) {
+            maybeScrollToCloze(elem);
+        }
+        fadeIn(elem);
+    }
+
+    function fadeIn(elem) {
+        elem.classList.add('enhanced-cloze-fade-in')
+        elem.addEventListener('animationend', function () {
+            elem.classList.remove('enhanced-cloze-fade-in')
+        }, { once: true })
+    }
+
+    function isVisible(elm) {
+        var visible = enhancedClozesViewport["visible"][elm.getAttribute('index')]
+        if (enhancedClozesViewport["observer"] && visible !== undefined) return visible
+
+        var rect = elm.getBoundingClientRect();
+        var viewHeight = Math.max(document.documentElement.clientHeight, window.innerHeight);
+        return !(rect.bottom < 0 || rect.top - viewHeight >= 0);
+    }
+
+    function maybeScrollToCloze(elem) {
+        if (!scrollToClozeOnToggle) return
+        // scrolling in the next frame uses the layout the browser computes for it anyway,
+        // scrolling right after changing the clozes would force an additional layout
+        onNextEnhancedClozesFrame(() => {
+            elem.scrollIntoView({ behavior: animateScroll ? "smooth" : "auto", block: "start" })
+        })
+    }
+
+    function defineEnhancedClozeAddEventListener() {
+        // define enhancedClozeAddEventListener
+        // this function is almost identical to `document.addEventListener`
+        // but removes the event listener attached on previous card / front side
+        // using this function
+        if (typeof window.enhancedClozeEventListener != "undefined") {
+            for (const listener of window.enhancedClozeEventListener) {
+                const type = listener[0]
+                const handler = listener[1]
+                document.removeEventListener(type, handler)
+            }
+        }
+        window.enhancedClozeEventListener = []
+
+        window.enhancedClozeAddEventListener = function (type, handler) {
+            document.addEventListener(type, handler)
+            window.enhancedClozeEventListener.push([type, handler])
+        }
+    }
+
+    var specialCharCodes = {
+        "-": "minus",
+        "=": "equal",
+        "[": "bracketleft",
+        "]": "bracketright",
+        ";": "semicolon",
+        "'": "quote",
+        "`": "backquote",
+        "\\": "backslash",
+        ",": "comma",
+        ".": "period",
+        "/": "slash",
+    };
+
+    // Returns function that match keyboard event to see if it matches given shortcut.
+    function shortcutMatcher(shortcut) {
+        var shortcutKeys = shortcut.toLowerCase().split(/[+]/).map(key => key.trim())
+        var mainKey = shortcutKeys[shortcutKeys.length - 1]
+        if (mainKey.length === 1) {
+            if (/\d/.test(mainKey)) {
+                mainKey = "digit" + mainKey
+            } else if (/[a-zA-Z]/.test(mainKey)) {
+                mainKey = "key" + mainKey
+            } else {
+                var code = specialCharCodes[mainKey];
+                if (code) {
+                    mainKey = code
+                }
+            }
+        }
+        var ctrl = shortcutKeys.includes("ctrl")
+        var shift = shortcutKeys.includes("shift")
+        var alt = shortcutKeys.includes("alt")
+
+        var matchShortcut = function (ctrl, shift, alt, mainKey, event) {
+            if (mainKey !== event.code.toLowerCase()) return false
+            if (ctrl !== (event.ctrlKey || event.metaKey)) return false
+            if (shift !== event.shiftKey) return false
+            if (alt !== event.altKey) return false
+            return true
+        }.bind(window, ctrl, shift, alt, mainKey)
+
+        return matchShortcut
+    }
+
+    function setupKeyListenerForCtrlKey() {
+        window.enhancedClozeAddEventListener("keydown", function (ev) {
+            if (isCtrlKey(ev.code)) ctrlDown = true;
+        })
+        window.enhancedClozeAddEventListener("keyup", function (ev) {
+            if (isCtrlKey(ev.code)) ctrlDown = false;
+        })
+    }
+
+
+    function isCtrlKey(keycode) {
+        return ['ControlLeft', 'MetaLeft'].includes(keycode)
+    }
+
+}
+
+// This function is defined outside of enhancedClozesMain because it is used by the onclick handlers of the headers
+function showNextElement(elem) {
+    var next = elem.nextElementSibling
+    if (next) next.style.display = "";
+}
+
+// This function is defined outside of enhancedClozesMain because it is used on the back side of the card as well
+function toggleCloze(elem, displayOption, renderMathjax = true) {
+    measureEnhancedClozesPhase("toggleCloze", () => toggleClozeUnmeasured(elem, displayOption, renderMathjax))
+}
+
+function toggleClozeUnmeasured(elem, displayOption, renderMathjax) {
+
+    if (elem == null) return
+
+    // if the element is not a cloze get its ancestor cloze
+    var cloze = elem.closest(".genuine-cloze, .pseudo-cloze")
+    if (cloze == null) return
+
+    var index = Number(cloze.getAttribute('index'))
+    var oldShowState = enhancedClozesData["showStates"][index]
+    var showState = oldShowState
+    if (displayOption == 'answer' || (displayOption == 'toggle' && showState == 'hint')) {
+        showState = 'answer'
+    } else if (displayOption == 'hint' || (displayOption == 'toggle' && showState == 'answer')) {
+        showState = 'hint'
+    } else {
+        return
+    }
+
+    var type = enhancedClozesData["types"][index]
+    if (showState != oldShowState) {
+        enhancedClozesData["showStates"][index] = showState
+        if (showState == 'hint') {
+            enhancedClozesData["hiddenCounts"][type] += 1
+            var position = enhancedClozesData["positionsInType"][index]
+            if (position < enhancedClozesData["firstHiddenPositions"][type]) {
+                enhancedClozesData["firstHiddenPositions"][type] = position
+            }
+        } else {
+            enhancedClozesData["hiddenCounts"][type] -= 1
+        }
+    }
+
+    cloze.setAttribute('show-state', showState)
+    cloze.innerHTML = enhancedClozeInnerHTML(index, `${type}-cloze`, showState)
+
+    // typeset the math in the cloze text
+    if (renderMathjax) {
+        typesetMathjaxLater(cloze)
+    }
+}
+
+function enhancedClozeInnerHTML(index, clozeType, showState) {
+    if (showState == 'answer') {
+        var answer = enhancedClozesData["answers"][index]
+        return answer.startsWith('#') ? answer.slice(1) : answer
+    }
+
+    var hint = enhancedClozesData["hints"][index]
+    if (!showHintsForPseudoClozes && clozeType == 'pseudo-cloze') {
+        hint = ""
+    }
+    return '&nbsp;&nbsp;[&nbsp;&nbsp;' + hint + '&nbsp;&nbsp;]&nbsp;&nbsp;'
+}
+
+function typesetMathjaxLater(elem) {
+    if (enhancedClozesViewport["observer"] && enhancedClozesViewport["visible"][elem.getAttribute('index')] !== true) {
+        // the cloze is typeset when it becomes visible, this includes clozes the observer hasn't reported yet
+        // (e.g. clozes revealed on the back side before its first callback), it reports every cloze initially
+        enhancedClozesViewport["deferredTypeset"].add(elem)
+        return
+    }
+
+    enhancedClozesElementsToTypeset.add(elem)
+    if (enhancedClozesTypesetScheduled) return
+
+    enhancedClozesTypesetScheduled = true
+    onNextEnhancedClozesFrame(typesetPendingElements)
+}
+
+function onNextEnhancedClozesFrame(fn) {
+    if (typeof requestAnimationFrame !== "undefined") {
+        requestAnimationFrame(fn)
+    } else {
+        setTimeout(fn, 0)
+    }
+}
+
+function typesetPendingElements() {
+    enhancedClozesTypesetScheduled = false
+    // elements of a previous card can't be typeset anymore
+    var elems = Array.from(enhancedClozesElementsToTypeset).filter(elem => elem.isConnected)
+    enhancedClozesElementsToTypeset.clear()
+    if (elems.length == 0 || typeof MathJax === "undefined") return
+
+    var start = startEnhancedClozesPhase("mathjax")
+    try {
+        if (typeof MathJax.typesetPromise === "function") {
+            // MathJax 3, the typeset calls have to be chained so that they don't run at the same time
+            var startup = MathJax.startup && MathJax.startup.promise ? MathJax.startup.promise : Promise.resolve()
+            var typeset = startup.then(() => {
+                // the old content of the elements was replaced, MathJax doesn't need to keep track of it anymore
+                if (typeof MathJax.typesetClear === "function") MathJax.typesetClear(elems)
+                return MathJax.typesetPromise(elems)
+            }).catch(error => console.log(`MathJax typesetting failed: ${error}`))
+                .then(() => recordEnhancedClozesPhase("mathjax", start))
+            if (MathJax.startup) MathJax.startup.promise = typeset
+        } else if (typeof MathJax.typeset === "function") {
+            MathJax.typeset(elems)
+            recordEnhancedClozesPhase("mathjax", start)
+        } else if (MathJax.Hub) {
+            // MathJax 2, used by older AnkiDroid versions
+            for (const elem of elems) {
+                MathJax.Hub.Queue(["Typeset", MathJax.Hub, elem])
+            }
+            MathJax.Hub.Queue(() => recordEnhancedClozesPhase("mathjax", start))
+        }
+    } catch (error) {
+        console.log(`MathJax typesetting failed: ${error}`)
+    }
+}
+
+function measureEnhancedClozesPhase(phase, fn) {
+    var start = startEnhancedClozesPhase(phase)
+    try {
+        return fn()
+    } finally {
+        recordEnhancedClozesPhase(phase, start)
+    }
+}
+
+function startEnhancedClozesPhase(phase) {
+    // returns null if performance data isn't collected
+    if (!enhancedClozesPerformance["enabled"]) return null
+
+    performance.mark(`enhanced-cloze-${phase}`)
+    return performance.now()
+}
+
+function recordEnhancedClozesPhase(phase, start) {
+    if (start === null) return
+
+    var duration = performance.now() - start
+    try {
+        // makes the phase show up in the performance panel of the dev tools
+        performance.measure(`enhanced-cloze-${phase}`, `enhanced-cloze-${phase}`)
+    } catch { }
+
+    var pending = enhancedClozesPerformance["pending"]
+    if (!pending[phase]) pending[phase] = { "ms": 0, "count": 0 }
+    pending[phase]["ms"] += duration
+    pending[phase]["count"] += 1
+
+    // phases measured shortly after each other are reported together
+    if (enhancedClozesPerformance["reportTimeout"] !== null) return
+    enhancedClozesPerformance["reportTimeout"] = setTimeout(reportEnhancedClozesPerformance, 500)
+}
+
+function reportEnhancedClozesPerformance() {
+    enhancedClozesPerformance["reportTimeout"] = null
+    var report = JSON.stringify({
+        "noteId": enhancedClozesPerformance["noteId"],
+        "clozes": enhancedClozesData["clozeId"].length,
+        "contentLength": enhancedClozesPerformance["contentLength"],
+        "phases": enhancedClozesPerformance["pending"],
+    })
+    enhancedClozesPerformance["pending"] = {}
+
+    if (typeof pycmd !== "undefined") {
+        // the report is collected by the add-on on Anki desktop
+        pycmd(`enhancedCloze:performance:${report}`)
+    } else {
+        console.log(`Enhanced Cloze performance: ${report}`)
+    }
+}
+
+enhancedClozesMain()
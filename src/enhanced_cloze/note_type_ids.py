@@ -0,0 +1,55 @@
+from typing import FrozenSet, Optional
+
+from aqt import mw
+from aqt.gui_hooks import profile_did_open, sync_did_finish
+
+from .constants import MODEL_NAME
+from .profiler import profiled
+
+try:
+    from aqt.gui_hooks import operation_did_execute
+except ImportError:
+    operation_did_execute = None  # type: ignore
+
+try:
+    from anki.collection import OpChanges  # pylint: disable = unused-import
+except:  # noqa
+    pass
+
+
+class _Cache:
+    def __init__(self) -> None:
+        # The ids are cached because the hooks which need them run for every note that is saved,
+        # fetching the note type for each of them is slow during imports and bulk edits.
+        self.enhanced_cloze_ids: Optional[FrozenSet[int]] = None
+
+
+_cache = _Cache()
+
+
+def setup_enhanced_cloze_ids() -> None:
+    profile_did_open.append(profiled(invalidate_enhanced_cloze_ids, "profile_did_open"))
+    sync_did_finish.append(profiled(invalidate_enhanced_cloze_ids, "sync_did_finish"))
+    if operation_did_execute is not None:
+        operation_did_execute.append(
+            profiled(_on_operation_did_execute, "operation_did_execute")
+        )
+
+
+def enhanced_cloze_ids() -> FrozenSet[int]:
+    if _cache.enhanced_cloze_ids is None:
+        model_id = mw.col.models.id_for_name(MODEL_NAME)
+        _cache.enhanced_cloze_ids = (
+            frozenset() if model_id is None else frozenset([model_id])
+        )
+    return _cache.enhanced_cloze_ids
+
+
+def invalidate_enhanced_cloze_ids() -> None:
+    """Call this after adding, renaming or removing note types without using an operation."""
+    _cache.enhanced_cloze_ids = None
+
+
+def _on_operation_did_execute(changes: "OpChanges", _handler: Optional[object]) -> None:
+    if changes.notetype:
+        invalidate_enhanced_cloze_ids()
@@ -1,10 +1,11 @@
 from anki.notes import Note
-from aqt import mw
 from aqt.editor import Editor
 from aqt.gui_hooks import add_cards_will_add_note
 from aqt.utils import tr
 
 from .constants import ANKI_VERSION_TUPLE, MODEL_NAME
+from .note_type_ids import enhanced_cloze_ids
+from .profiler import profiled
 
 
 def setup_prevent_warnings_about_clozes() -> None:
@@ -22,21 +23,21 @@ def setup_prevent_warnings_about_clozes() -> None:
             # the exact value is not important, it has to be an non-empty array
             return [0]
 
-        ModelManager._availClozeOrds = (  # type: ignore  # pylint: disable=protected-access
-            new_availClozeOrds
+        ModelManager._availClozeOrds = profiled(  # type: ignore  # pylint: disable=protected-access
+            new_availClozeOrds, "ModelManager._availClozeOrds"
         )
     elif ANKI_VERSION_TUPLE < (2, 1, 45):
         original_cloze_numbers_in_fields = Note.cloze_numbers_in_fields
 
         def new_cloze_numbers_in_fields(self):
-            if self.note_type()["name"] != MODEL_NAME:
+            if self.mid not in enhanced_cloze_ids():
                 return original_cloze_numbers_in_fields(self)
 
             # the exact value is not important, it has to be an non-empty array
             return [0]
 
-        Note.cloze_numbers_in_fields = (  # type: ignore # pylint: disable=protected-access
-            new_cloze_numbers_in_fields
+        Note.cloze_numbers_in_fields = profiled(  # type: ignore # pylint: disable=protected-access
+            new_cloze_numbers_in_fields, "Note.cloze_numbers_in_fields"
         )
     else:
         from anki.notes import NoteFieldsCheckResult
@@ -48,19 +49,20 @@ def setup_prevent_warnings_about_clozes() -> None:
         def _update_duplicate_display_ignore_cloze_problems_for_enh_clozes(
             self, result
         ) -> None:
-            if self.note.note_type()["name"] == MODEL_NAME:
+            if self.note.mid in enhanced_cloze_ids():
                 if result == NoteFieldsCheckResult.NOTETYPE_NOT_CLOZE:
                     result = NoteFieldsCheckResult.NORMAL
                 if result == NoteFieldsCheckResult.FIELD_NOT_CLOZE:
                     result = NoteFieldsCheckResult.NORMAL
             original_update_duplicate_display(self, result)
 
-        Editor._update_duplicate_display = (  # type: ignore  # pylint: disable=protected-access
-            _update_duplicate_display_ignore_cloze_problems_for_enh_clozes
+        Editor._update_duplicate_display = profiled(  # type: ignore  # pylint: disable=protected-access
+            _update_duplicate_display_ignore_cloze_problems_for_enh_clozes,
+            "Editor._update_duplicate_display",
         )
 
         def ignore_some_cloze_problems_for_enh_clozes(problem, note):
-            if note.note_type()["name"] != MODEL_NAME:
+            if note.mid not in enhanced_cloze_ids():
                 return problem
 
             if problem == tr.adding_cloze_outside_cloze_notetype():
@@ -70,7 +72,11 @@ def setup_prevent_warnings_about_clozes() -> None:
             else:
                 return problem
 
-        add_cards_will_add_note.append(ignore_some_cloze_problems_for_enh_clozes)
+        add_cards_will_add_note.append(
+            profiled(
+                ignore_some_cloze_problems_for_enh_clozes, "add_cards_will_add_note"
+            )
+        )
 
         # the warning about no clozes in the field will still show up in version lower 2.1.45
         original_fields_check = Note.fields_check
@@ -78,7 +84,7 @@ def setup_prevent_warnings_about_clozes() -> None:
         def new_fields_check(self):
             result = original_fields_check(self)
 
-            if mw.col.models.get(self.mid)["name"] != MODEL_NAME:
+            if self.mid not in enhanced_cloze_ids():
                 return result
 
             if result == NoteFieldsCheckResult.MISSING_CLOZE:
@@ -86,4 +92,6 @@ def setup_prevent_warnings_about_clozes() -> None:
             else:
                 return result
 
-        Note.fields_check = new_fields_check  # type: ignore
+        Note.fields_check = profiled(  # type: ignore
+            new_fields_check, "Note.fields_check"
+        )
@@ -0,0 +1,138 @@
+"""Opt-in profiling of the functions the add-on registers on hooks and the methods it patches.
+
+Profiling is enabled with the profileHooks config option and takes effect after restarting Anki.
+When it is disabled, profiled() returns the functions unchanged, so the hooks have no overhead.
+Log events are always recorded, they are shown in the Debug tab of the config window together with the
+profiling results.
+"""
+
+import functools
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
+
+from .config import PROFILE_HOOKS_CONFIG_KEY, conf
+
+# the p95 latency is computed from this many most recent calls of a function
+MAX_RECORDED_DURATIONS = 1000
+MAX_LOG_EVENTS = 200
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class HookStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.recent_durations: Deque[float] = deque(maxlen=MAX_RECORDED_DURATIONS)
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        self.recent_durations.append(seconds)
+
+    def p95_seconds(self) -> float:
+        durations = sorted(self.recent_durations)
+        if not durations:
+            return 0.0
+        return durations[math.ceil(len(durations) * 0.95) - 1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_seconds * 1000,
+            "mean_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "p95_ms": self.p95_seconds() * 1000,
+        }
+
+
+_stats: Dict[str, HookStats] = {}
+_log_events: Deque[Dict[str, Any]] = deque(maxlen=MAX_LOG_EVENTS)
+
+
+class _Cache:
+    def __init__(self) -> None:
+        # whether profiling is enabled, the config option is read once, changes take effect after restarting Anki
+        self.enabled: Optional[bool] = None
+
+
+_cache = _Cache()
+
+
+def profiling_enabled() -> bool:
+    if _cache.enabled is None:
+        _cache.enabled = bool(conf.get(PROFILE_HOOKS_CONFIG_KEY, False))
+    return _cache.enabled
+
+
+def profiled(fn: F, hook_name: Optional[str] = None) -> F:
+    """Returns a wrapper of fn which records how long its calls take if profiling is enabled, else fn itself.
+    hook_name is the name of the hook or patched method fn is used for, it's used in the name of the stats."""
+    if not profiling_enabled():
+        return fn
+
+    name = f"{fn.__module__.split('.')[-1]}.{fn.__qualname__}"
+    if hook_name is not None:
+        name = f"{hook_name}: {name}"
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _stats.setdefault(name, HookStats()).add(time.perf_counter() - start)
+
+    return wrapper  # type: ignore
+
+
+def log_event(event: str, **data: Any) -> None:
+    _log_events.append({"time": time.time(), "event": event, **data})
+
+
+def reset_profiling_results() -> None:
+    _stats.clear()
+    _log_events.clear()
+
+
+def profiling_results() -> Dict[str, Any]:
+    return {
+        "enabled": profiling_enabled(),
+        "hooks": {name: stats.to_dict() for name, stats in _stats.items()},
+        "events": list(_log_events),
+    }
+
+
+def profiling_report() -> str:
+    "Returns the results as text, the functions are ordered by their cumulative time."
+    lines: List[str] = []
+    if not profiling_enabled():
+        lines.append("Profiling is disabled.")
+    elif not _stats:
+        lines.append("No hooks were called yet.")
+    else:
+        lines.append(
+            f"{'hook':<70}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'p95 ms':>10}"
+        )
+        for name, stats in sorted(
+            _stats.items(), key=lambda item: item[1].total_seconds, reverse=True
+        ):
+            d = stats.to_dict()
+            lines.append(
+                f"{name:<70}{d['calls']:>8}{d['total_ms']:>12.1f}{d['mean_ms']:>10.2f}{d['p95_ms']:>10.2f}"
+            )
+
+    if _log_events:
+        lines.append("")
+        lines.append("Events:")
+        for event in _log_events:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+            data = ", ".join(
+                f"{key}={value}"
+                for key, value in event.items()
+                if key not in ("time", "event")
+            )
+            lines.append(f"{timestamp} {event['event']} {data}".rstrip())
+
+    return "\n".join(lines)
@@ -0,0 +1,229 @@
+"""Assembles the card templates from the files in the note_type folder.
+
+The templates can contain <!-- INLINE file_name --> comments which are replaced by the minified content of the
+file (a .js file in the same folder). <!-- MEDIA file_name --> comments are replaced by a script tag which loads
+the minified file from the media folder. The name of the media file contains a hash of its content, so the webview
+can cache the file across cards and a changed file gets a new name. Everything else in the templates is kept as it
+is, including the <!-- VERSION -->, <!-- CONFIG END --> and <!-- ENHANCED_CLOZE --> comments and the config script.
+
+This module doesn't depend on Anki, so that it can be used by the scripts in the scripts folder.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+INLINE_RE = re.compile(r"<!-- INLINE (\S+) -->")
+MEDIA_RE = re.compile(r"<!-- MEDIA (\S+) -->")
+# The underscore in the front prevents Anki from cleaning up the file when Check Media is run.
+MEDIA_FILE_NAME_FORMAT = "_{stem}_runtime.{digest}.js"
+
+# characters after which a "/" starts a regex literal instead of being a division
+_REGEX_PRECEDING_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PRECEDING_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of"}
+# whitespace next to these characters can be removed
+_TIGHT_CHARS = set("{}()[];,:=<>?&|!*")
+
+
+class BuiltTemplate(NamedTuple):
+    template: str
+    # paths of the template and the files inlined into it
+    source_paths: List[Path]
+    # size of the template with the inlined files and the media files before minification
+    source_size: int
+    # content of the files the template loads from the media folder by their names
+    media_files: Dict[str, str]
+
+    @property
+    def size(self) -> int:
+        return len(self.template)
+
+    @property
+    def total_size(self) -> int:
+        "Size of the template and the media files it loads."
+        return self.size + sum(len(content) for content in self.media_files.values())
+
+
+def build_template(path: Path) -> BuiltTemplate:
+    with open(path) as f:
+        template = f.read()
+
+    source_paths = [path]
+    source_size = len(template)
+
+    def inline(m: re.Match) -> str:
+        nonlocal source_size
+
+        inline_path = path.parent / m.group(1)
+        source_paths.append(inline_path)
+        with open(inline_path) as f:
+            code = f.read()
+        source_size += len(code) - len(m.group(0))
+        return f"<script>\n{minify_js(code)}\n</script>"
+
+    media_files: Dict[str, str] = {}
+
+    def media_script(m: re.Match) -> str:
+        nonlocal source_size
+
+        media_path = path.parent / m.group(1)
+        source_paths.append(media_path)
+        with open(media_path) as f:
+            source = f.read()
+        source_size += len(source)
+        code = minify_js(source)
+        name = media_file_name(media_path, code)
+        media_files[name] = code
+        return f'<script src="{name}"></script>'
+
+    template = INLINE_RE.sub(inline, template)
+    template = MEDIA_RE.sub(media_script, template)
+    return BuiltTemplate(
+        template=template,
+        source_paths=source_paths,
+        source_size=source_size,
+        media_files=media_files,
+    )
+
+
+def media_file_name(path: Path, content: str) -> str:
+    digest = hashlib.sha1(content.encode()).hexdigest()[:12]
+    return MEDIA_FILE_NAME_FORMAT.format(stem=path.stem, digest=digest)
+
+
+def minify_js(code: str) -> str:
+    """Removes comments, indentation, empty lines and unnecessary spaces.
+
+    Line breaks are kept because the code relies on automatic semicolon insertion.
+    Strings, template literals and regex literals are kept as they are.
+    """
+    result: List[str] = []
+    # the nesting of template literals and of ${...} expressions inside them,
+    # contains "`" for a template literal and the number of open braces for an expression
+    stack: List = []
+    last_significant = ""
+    last_word = ""
+    i = 0
+    n = len(code)
+
+    def emit_space() -> None:
+        if (
+            result
+            and result[-1] not in (" ", "\n")
+            and result[-1][-1] not in _TIGHT_CHARS
+        ):
+            result.append(" ")
+
+    while i < n:
+        c = code[i]
+
+        if stack and stack[-1] == "`":
+            # inside a template literal
+            if c == "\\":
+                result.append(code[i : i + 2])
+                i += 2
+            elif c == "`":
+                stack.pop()
+                result.append(c)
+                last_significant = c
+                i += 1
+            elif code.startswith("${", i):
+                stack.append(0)
+                result.append("${")
+                last_significant = "{"
+                i += 2
+            else:
+                result.append(c)
+                i += 1
+            continue
+
+        # whitespace and comments
+        if c in " \t\r":
+            i += 1
+            if i < n and code[i] not in " \t\r\n":
+                emit_space()
+            continue
+        if c == "\n":
+            while result and result[-1] == " ":
+                result.pop()
+            if result and result[-1] != "\n":
+                result.append("\n")
+            i += 1
+            continue
+        if code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            # keep the line break, it can matter for automatic semicolon insertion
+            if "\n" in code[i:end] and result and result[-1] != "\n":
+                result.append("\n")
+            i = end
+            continue
+
+        if c in "\"'":
+            end = i + 1
+            while end < n and code[end] != c:
+                end += 2 if code[end] == "\\" else 1
+            result.append(code[i : end + 1])
+            last_significant = c
+            i = end + 1
+        elif c == "`":
+            stack.append("`")
+            result.append(c)
+            i += 1
+        elif c == "/" and (
+            not last_significant
+            or last_significant in _REGEX_PRECEDING_CHARS
+            or last_word in _REGEX_PRECEDING_KEYWORDS
+        ):
+            end = i + 1
+            in_class = False
+            while end < n and (in_class or code[end] != "/"):
+                if code[end] == "\\":
+                    end += 1
+                elif code[end] == "[":
+                    in_class = True
+                elif code[end] == "]":
+                    in_class = False
+                end += 1
+            end += 1
+            while end < n and code[end].isalpha():
+                end += 1
+            result.append(code[i:end])
+            last_significant = "/"
+            i = end
+        elif _is_word_char(c):
+            end = i + 1
+            while end < n and _is_word_char(code[end]):
+                end += 1
+            last_word = code[i:end]
+            result.append(last_word)
+            last_significant = c
+            i = end
+            continue
+        else:
+            if c in _TIGHT_CHARS and result and result[-1] == " ":
+                result.pop()
+            if stack and c == "{":
+                stack[-1] += 1
+            elif stack and c == "}":
+                if stack[-1] == 0:
+                    # end of a ${...} expression in a template literal
+                    stack.pop()
+                else:
+                    stack[-1] -= 1
+            result.append(c)
+            last_significant = c
+            i += 1
+
+        last_word = ""
+
+    return "".join(result).strip()
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c in "_$"